@@ -0,0 +1,189 @@
+import csv
+import io
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from auth.hashing import hash_passwords
+from auth.models import Membership
+from auth.owners import LastOwnerError, add_owners, is_owner, remove_owner
+from auth.serializers import DUPLICATE_EMAIL_MESSAGE
+from auth.tokens import bump_token_versions
+from .cache import bump_member_list_version
+from .serializers import MemberImportSerializer
+
+User = get_user_model()
+
+MAX_IMPORT_ROWS = 10000
+BATCH_SIZE = 500
+IMPORT_ENCODINGS = ('utf-8-sig', 'cp1252')
+
+
+def read_import_rows(request):
+    """
+    Extrai as linhas da importação: um array JSON no corpo ou um arquivo CSV
+    enviado no campo `file` com as colunas email, full_name, password e role.
+    """
+    upload = request.FILES.get('file')
+    if upload is not None:
+        content = io.StringIO(decode_import_file(upload.read()))
+        try:
+            return list(csv.DictReader(content))
+        except csv.Error as e:
+            raise ValidationError({'file': [f'Arquivo CSV inválido: {e}.']})
+    
+    if isinstance(request.data, list):
+        return request.data
+    
+    return None
+
+
+def decode_import_file(data):
+    """
+    Decodifica o CSV como UTF-8 e, se falhar, como Windows-1252, a
+    codificação do "CSV" exportado pelo Excel em português.
+    """
+    for encoding in IMPORT_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValidationError({'file': ['Não foi possível ler o arquivo: salve o CSV em UTF-8.']})
+
+
+def find_existing_emails(emails):
+    """Consulta em lotes quais emails já estão cadastrados"""
+    existing = set()
+    emails = list(emails)
+    for start in range(0, len(emails), BATCH_SIZE):
+        existing.update(
+            User.objects.filter(email__in=emails[start:start + BATCH_SIZE])
+            .values_list('email', flat=True)
+        )
+    return existing
+
+
+def import_members(organization, rows):
+    """
+    Cria usuários e associações a partir das linhas informadas.
+
+    Linhas inválidas ou com email já existente são reportadas e ignoradas;
+    as demais são gravadas com `bulk_create` em uma única transação. Retorna
+    o relatório por linha, na ordem de entrada.
+    """
+    report = []
+    valid = []
+    seen = set()
+    
+    for index, row in enumerate(rows, start=1):
+        serializer = MemberImportSerializer(data=row)
+        if not serializer.is_valid():
+            report.append({
+                'row': index,
+                'email': row.get('email') if isinstance(row, dict) else None,
+                'status': 'error',
+                'errors': serializer.errors
+            })
+            continue
+        
+        data = serializer.validated_data
+        email = User.objects.normalize_email(data['email'])
+        entry = {'row': index, 'email': email, 'status': 'created'}
+        report.append(entry)
+        
+        if email in seen:
+            entry.update(status='error', errors={'email': ['Email repetido na importação.']})
+            continue
+        seen.add(email)
+        valid.append((entry, data, email))
+    
+    existing = find_existing_emails(seen)
+    pending = []
+    for entry, data, email in valid:
+        if email in existing:
+            entry.update(status='error', errors={'email': [DUPLICATE_EMAIL_MESSAGE]})
+        else:
+            pending.append((entry, data, email))
+    
+    if not pending:
+        return report
+    
+    hashes = hash_passwords(data['password'] for _, data, _ in pending)
+    
+    users = []
+    for (entry, data, email), password in zip(pending, hashes):
+        name_parts = data['full_name'].split(' ', 1)
+        users.append(User(
+            email=email,
+            username=email,
+            password=password,
+            first_name=name_parts[0],
+            last_name=name_parts[1] if len(name_parts) > 1 else '',
+            org_active=organization
+        ))
+    
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        Membership.objects.bulk_create([
+            Membership(
+                user=user,
+                organization=organization,
+                role=data['role'],
+                is_active=True
+            )
+            for user, (_, data, _) in zip(users, pending)
+        ], batch_size=BATCH_SIZE)
+        # bulk_create não dispara post_save nem passa por save_membership.
+        add_owners(organization.pk, sum(data['role'] == Membership.Roles.OWNER for _, data, _ in pending))
+        bump_member_list_version(organization.pk)
+    
+    for user, (entry, _, _) in zip(users, pending):
+        entry['id'] = user.pk
+    
+    return report
+
+
+def update_members(organization, user_ids, role=None, status=None):
+    """
+    Aplica `role` e/ou `status` às associações dos usuários informados com um
+    único UPDATE restrito à organização.
+
+    As linhas alvo são lidas e travadas antes, para calcular quantos
+    proprietários ativos a alteração remove ou cria; o contador da
+    organização é ajustado pelo mesmo UPDATE condicional de `save_membership`
+    e a operação é recusada com `LastOwnerError` se não restaria nenhum.
+    Retorna `(atualizados, ids não encontrados)`.
+    """
+    memberships = Membership.objects.filter(organization=organization, user_id__in=user_ids)
+    changes = {}
+    if role is not None:
+        changes['role'] = role
+    if status is not None:
+        changes['is_active'] = status
+    
+    with transaction.atomic():
+        rows = list(memberships.select_for_update().values_list('user_id', 'role', 'is_active'))
+        
+        removed = added = 0
+        for _, current_role, current_status in rows:
+            was_owner = is_owner(current_role, current_status)
+            will_be_owner = is_owner(changes.get('role', current_role), changes.get('is_active', current_status))
+            removed += was_owner and not will_be_owner
+            added += will_be_owner and not was_owner
+        
+        if removed > added:
+            if not remove_owner(organization.pk, removed - added):
+                raise LastOwnerError()
+        else:
+            add_owners(organization.pk, added - removed)
+        
+        # `.update()` não dispara sinais nem preenche `auto_now`: as
+        # invalidações feitas pelos sinais de post_save são repetidas aqui.
+        updated = memberships.update(updated=timezone.now(), **changes)
+        found = [user_id for user_id, _, _ in rows]
+        bump_member_list_version(organization.pk)
+        bump_token_versions(found)
+    
+    missing = sorted(set(user_ids) - set(found))
+    return updated, missing
@@ -0,0 +1,67 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.http import quote_etag
+
+from auth.models import Organization
+
+MEMBER_LIST_KEY = 'accounts:member-list:{}:{}:{}'
+
+
+def get_member_list_version(organization):
+    """
+    Retorna a versão da listagem de membros da organização.
+
+    A versão é `Organization.member_list_version`, no banco, e não uma chave
+    do cache: todos os processos enxergam o mesmo valor. Se a organização foi
+    carregada do banco nesta requisição, junto com a associação, o valor já
+    está na instância; se veio das claims do token, custa uma busca pela pk.
+    """
+    if not organization._state.adding:
+        return organization.member_list_version
+    return Organization.objects.filter(pk=organization.pk).values_list('member_list_version', flat=True).first()
+
+
+async def aget_member_list_version(organization):
+    """Versão assíncrona de `get_member_list_version`"""
+    if not organization._state.adding:
+        return organization.member_list_version
+    return await Organization.objects.filter(pk=organization.pk).values_list('member_list_version', flat=True).afirst()
+
+
+def member_list_etag(organization_id, version, path):
+    """ETag da listagem: organização, versão da listagem e caminho com os parâmetros da consulta"""
+    validator = f'{organization_id}:{version}:{path}'
+    return quote_etag(hashlib.md5(validator.encode(), usedforsecurity=False).hexdigest())
+
+
+def bump_member_list_version(organization_id):
+    """
+    Invalida o ETag e as páginas em cache da organização.
+
+    O incremento é um UPDATE na transação da própria alteração: até o commit,
+    outras leituras ainda veem a versão e os dados antigos juntos.
+    """
+    bump_member_list_versions([organization_id])
+
+
+def bump_member_list_versions(organization_ids):
+    """Versão em lote de `bump_member_list_version`; aceita também uma subconsulta de ids"""
+    Organization.objects.filter(pk__in=organization_ids).update(
+        member_list_version=F('member_list_version') + 1
+    )
+
+
+def member_list_key(organization_id, version, url):
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return MEMBER_LIST_KEY.format(organization_id, version, digest)
+
+
+def get_cached_member_list(key):
+    return cache.get(key)
+
+
+def set_cached_member_list(key, data):
+    cache.set(key, data, timeout=settings.MEMBER_LIST_CACHE_TIMEOUT)
@@ -0,0 +1,18 @@
+from auth.search import search_users
+
+
+def filter_members(queryset, q='', role=None, status=None):
+    """
+    Aplica a busca e os filtros da listagem às associações da organização.
+
+    `q` casa por prefixo com as palavras do email, nome e sobrenome, pelo
+    índice de busca de usuários (`auth.search`); `role` e `status` filtram
+    o papel e a situação da associação.
+    """
+    if role:
+        queryset = queryset.filter(role=role)
+    if status is not None:
+        # `is_active=False` vira `NOT is_active`, que o SQLite não resolve
+        # pelo índice (organização, is_active); o IN vira uma igualdade.
+        queryset = queryset.filter(is_active__in=[status])
+    return search_users(queryset, q, field='user')
@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MemberCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) para a listagem de membros.
+
+    Ordena pelo id da associação, que é único e indexado junto com a
+    organização, então qualquer página custa o mesmo que a primeira:
+    sem OFFSET e sem COUNT(*). O cursor é opaco e preserva os demais
+    parâmetros da URL, como filtros.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,121 @@
+from rest_framework import exceptions, status
+from rest_framework.permissions import BasePermission
+from auth.backends import get_active_membership
+from auth.models import Membership
+
+
+class NoActiveOrganization(exceptions.APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Usuário não possui organização ativa'
+    default_code = 'no_active_organization'
+
+
+def get_request_membership(request):
+    """
+    Retorna a associação ativa do usuário autenticado com sua organização
+    ativa, resolvida uma única vez por requisição.
+
+    Quando o token já traz o papel e o status (autenticação sem estado), a
+    associação é montada a partir das claims, sem consultar o banco. Caso
+    contrário, ela vem anotada no usuário pela mesma consulta que o
+    autenticou (`MembershipJWTAuthentication`).
+    """
+    try:
+        return request._membership
+    except AttributeError:
+        pass
+
+    request._membership = resolve_membership(request.user)
+    return request._membership
+
+
+def membership_from_claims(user):
+    """Monta a associação a partir das claims do token, se existirem"""
+    token = getattr(user, 'token', None)
+    if token is None or 'role' not in token:
+        return None, False
+
+    if not token['role'] or not token['membership_active']:
+        return None, True
+    return Membership(
+        user_id=user.pk,
+        organization=user.org_active,
+        role=token['role'],
+        is_active=True
+    ), True
+
+
+def membership_from_user(user):
+    """Associação anotada no usuário por `with_active_membership`, se existir"""
+    membership = get_active_membership(user)
+    if membership is None:
+        return None, False
+    return (membership if membership.is_active else None), True
+
+
+def loaded_membership(user):
+    """Associação que não exige consulta: das claims do token ou anotada no usuário"""
+    membership, found = membership_from_claims(user)
+    if found:
+        return membership, True
+    return membership_from_user(user)
+
+
+def membership_queryset(user):
+    return Membership.objects.select_related('organization').filter(
+        user_id=user.pk,
+        organization_id=user.org_active_id,
+        is_active=True
+    )
+
+
+def resolve_membership(user):
+    if not getattr(user, 'org_active_id', None):
+        return None
+
+    membership, loaded = loaded_membership(user)
+    if loaded:
+        return membership
+
+    membership = membership_queryset(user).first()
+    if membership is not None:
+        user.org_active = membership.organization
+    return membership
+
+
+async def aresolve_membership(user):
+    """Versão assíncrona de `resolve_membership`"""
+    if not getattr(user, 'org_active_id', None):
+        return None
+
+    membership, loaded = loaded_membership(user)
+    if loaded:
+        return membership
+
+    membership = await membership_queryset(user).afirst()
+    if membership is not None:
+        user.org_active = membership.organization
+    return membership
+
+
+class IsOrgMember(BasePermission):
+    """Permite acesso apenas a membros ativos da organização ativa do usuário"""
+    message = 'Usuário não é membro da organização'
+
+    def has_permission(self, request, view):
+        if not getattr(request.user, 'org_active_id', None):
+            raise NoActiveOrganization()
+        return get_request_membership(request) is not None
+
+
+class IsOrgManagerOrOwner(IsOrgMember):
+    """Permite acesso apenas a OWNER e MANAGER da organização ativa do usuário"""
+    message = 'Sem permissão para gerenciar membros. Apenas OWNER e MANAGER podem gerenciar membros.'
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            raise exceptions.PermissionDenied(IsOrgMember.message)
+        return get_request_membership(request).role in [
+            Membership.Roles.OWNER,
+            Membership.Roles.MANAGER
+        ]
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from auth.models import Membership, Organization
+from auth.owners import save_membership
+from auth.serializers import DUPLICATE_EMAIL_MESSAGE
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
@@ -36,7 +40,8 @@ class OrganizationMemberSerializer(serializers.ModelSerializer):
             'password'
         ]
         extra_kwargs = {
-            'email': {'required': True},
+            # Sem o UniqueValidator: a unicidade vem da constraint do banco.
+            'email': {'required': True, 'validators': []},
         }
 
     def validate(self, attrs):
@@ -48,15 +53,10 @@ class OrganizationMemberSerializer(serializers.ModelSerializer):
         
         return attrs
 
-    def validate_email(self, value):
-        if self.instance is None or (self.instance and self.instance.email != value):
-            if User.objects.filter(email=value).exists():
-                raise serializers.ValidationError("Um usuário com este email já existe.")
-        return value
-
     def create(self, validated_data):
         role = validated_data.pop('role', Membership.Roles.MEMBER)
         password = validated_data.pop('password')
+        password_hash = validated_data.pop('password_hash', None)
         full_name = validated_data.pop('full_name')
         
         name_parts = full_name.split(' ', 1)
@@ -67,25 +67,30 @@ class OrganizationMemberSerializer(serializers.ModelSerializer):
         if not organization:
             raise serializers.ValidationError("Organização não encontrada no contexto.")
         
-        user = User.objects.create_user(
-            username=validated_data['email'],
-            password=password,
+        email = User.objects.normalize_email(validated_data.pop('email'))
+        user = User(
+            username=email,
+            email=email,
+            password=password_hash or make_password(password),
             first_name=first_name,
             last_name=last_name,
+            org_active=organization,
             **validated_data
         )
         
-        membership = Membership.objects.create(
-            user=user,
-            organization=organization,
-            role=role,
-            is_active=True
-        )
-        
-        if not user.org_active:
-            user.org_active = organization
-            user.save()
-        
+        try:
+            with transaction.atomic():
+                user.save()
+                membership = save_membership(Membership(
+                    user=user,
+                    organization=organization,
+                    role=role,
+                    is_active=True
+                ))
+        except IntegrityError:
+            raise serializers.ValidationError({'email': [DUPLICATE_EMAIL_MESSAGE]})
+        
+        user.current_membership = [membership]
         return user
 
     def update(self, instance, validated_data):
@@ -93,40 +98,117 @@ class OrganizationMemberSerializer(serializers.ModelSerializer):
         
         validated_data.pop('password', None)
         
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        organization = self.context.get('organization')
-        
-        if organization and role is not None:
-            try:
-                membership = Membership.objects.get(user=instance, organization=organization)
-                membership.role = role
-                membership.save()
-            except Membership.DoesNotExist:
-                pass
+        try:
+            with transaction.atomic():
+                if validated_data:
+                    for attr, value in validated_data.items():
+                        setattr(instance, attr, value)
+                    instance.save()
+                
+                if role is not None:
+                    membership = self.get_membership(instance)
+                    if membership is not None:
+                        membership.role = role
+                        # Levanta LastOwnerError (400) ao rebaixar o último proprietário.
+                        save_membership(membership)
+        except IntegrityError:
+            raise serializers.ValidationError({'email': [DUPLICATE_EMAIL_MESSAGE]})
         
         return instance
 
+    def get_membership(self, instance):
+        """Retorna a associação do usuário com a organização do contexto"""
+        prefetched = getattr(instance, 'current_membership', None)
+        if prefetched is not None:
+            return prefetched[0] if prefetched else None
+        
+        organization_id = self.get_organization_id(instance)
+        if not organization_id:
+            return None
+        
+        try:
+            membership = Membership.objects.get(user=instance, organization_id=organization_id)
+        except Membership.DoesNotExist:
+            membership = None
+        
+        instance.current_membership = [membership] if membership else []
+        return membership
+
+    def get_organization_id(self, instance):
+        """Retorna o id da organização do contexto ou da organização ativa do usuário"""
+        organization = self.context.get('organization')
+        if organization:
+            return organization.pk
+        return getattr(instance, 'org_active_id', None)
+
     def to_representation(self, instance):
+        if isinstance(instance, Membership):
+            membership = instance
+            instance = membership.user
+            instance.current_membership = [membership]
+        
         data = super().to_representation(instance)
         
         data.pop('full_name', None)
         data.pop('password', None)
         
-        organization = self.context.get('organization')
+        membership = self.get_membership(instance)
         
-        if not organization and hasattr(instance, 'org_active'):
-            organization = instance.org_active
-            
-        if organization:
-            try:
-                membership = Membership.objects.get(user=instance, organization=organization)
-                data['role'] = membership.get_role_display()
-                data['status'] = membership.is_active
-            except Membership.DoesNotExist:
-                data['role'] = None
-                data['status'] = False
-        
-        return data
\ No newline at end of file
+        if membership is not None:
+            data['role'] = membership.get_role_display()
+            data['status'] = membership.is_active
+        elif self.get_organization_id(instance):
+            data['role'] = None
+            data['status'] = False
+        
+        return data
+
+
+class MemberFilterSerializer(serializers.Serializer):
+    """Parâmetros de busca e filtro da listagem de membros"""
+    
+    q = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        help_text='Busca por prefixo nas palavras do email, nome e sobrenome'
+    )
+    role = serializers.ChoiceField(choices=Membership.Roles.choices, required=False)
+    status = serializers.BooleanField(required=False, help_text='Situação da associação (ativo ou inativo)')
+
+
+class MemberBulkUpdateSerializer(serializers.Serializer):
+    """Alteração em lote de papel e/ou situação de membros da organização"""
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000,
+        help_text='Ids dos membros, como retornados na listagem'
+    )
+    role = serializers.ChoiceField(choices=Membership.Roles.choices, required=False)
+    status = serializers.BooleanField(required=False, help_text='Situação da associação (ativo ou inativo)')
+
+    def validate(self, attrs):
+        if 'role' not in attrs and 'status' not in attrs:
+            raise serializers.ValidationError('Informe o role e/ou o status a aplicar.')
+        return attrs
+
+
+class MemberImportSerializer(serializers.Serializer):
+    """Valida uma linha da importação em lote de membros"""
+    
+    email = serializers.EmailField()
+    full_name = serializers.CharField()
+    password = serializers.CharField(write_only=True)
+    role = serializers.ChoiceField(
+        choices=Membership.Roles.choices,
+        default=Membership.Roles.MEMBER,
+        required=False
+    )
+
+    def validate_password(self, value):
+        try:
+            validate_password(value)
+        except ValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return value
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from auth.models import Membership, Organization, User
+from .cache import bump_member_list_version, bump_member_list_versions
+
+# Campos do usuário que aparecem na listagem de membros.
+MEMBER_LIST_USER_FIELDS = {'email', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def invalidate_member_list_on_membership_change(sender, instance, **kwargs):
+    bump_member_list_version(instance.organization_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_member_list_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not MEMBER_LIST_USER_FIELDS.intersection(update_fields):
+        return
+    bump_member_list_versions(
+        Membership.objects.filter(user_id=instance.pk).values('organization_id')
+    )
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_member_list_on_organization_change(sender, instance, created, **kwargs):
+    if created:
+        return
+    bump_member_list_version(instance.pk)
@@ -0,0 +1,43 @@
+from rest_framework.utils.encoders import JSONEncoder
+
+# Linhas lidas do banco e enviadas ao cliente por vez.
+STREAM_CHUNK_SIZE = 500
+
+
+def stream_json_array(items, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Gera um array JSON em pedaços de bytes a partir de um iterável de objetos,
+    sem montar a lista inteira em memória.
+    """
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    buffer = []
+    separator = '['
+
+    for item in items:
+        buffer.append(separator)
+        buffer.append(encoder.encode(item))
+        separator = ','
+        if len(buffer) >= chunk_size * 2:
+            yield ''.join(buffer).encode()
+            buffer = []
+
+    buffer.append('[]' if separator == '[' else ']')
+    yield ''.join(buffer).encode()
+
+
+async def astream_json_array(items, chunk_size=STREAM_CHUNK_SIZE):
+    """Versão assíncrona de `stream_json_array`, para iteráveis assíncronos"""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    buffer = []
+    separator = '['
+
+    async for item in items:
+        buffer.append(separator)
+        buffer.append(encoder.encode(item))
+        separator = ','
+        if len(buffer) >= chunk_size * 2:
+            yield ''.join(buffer).encode()
+            buffer = []
+
+    buffer.append('[]' if separator == '[' else ']')
+    yield ''.join(buffer).encode()
@@ -1,3 +1,511 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework import status
+
+from auth.models import Membership, Organization, User
+from auth.tests import PASSWORD, AuthTestCase
+from config.middleware import RequestMetricsMiddleware
+
+MEMBERS_URL = '/api/v1/accounts/members/'
+ASYNC_MEMBERS_URL = '/api/v1/accounts/async/members/'
+BULK_IMPORT_URL = f'{MEMBERS_URL}bulk/'
+BULK_UPDATE_URL = f'{MEMBERS_URL}bulk-update/'
+
+
+class MemberListETagTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.owner.email)
+
+    def get_etag(self):
+        response = self.client.get(MEMBERS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response['ETag']
+
+    def revalidate(self, etag):
+        return self.client.get(MEMBERS_URL, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_answers_304(self):
+        etag = self.get_etag()
+
+        response = self.revalidate(etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_through_the_api_changes_the_etag(self):
+        etag = self.get_etag()
+
+        response = self.client.patch(f'{MEMBERS_URL}{self.member.pk}/', {'role': 'manager'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+
+        response = self.revalidate(etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        roles = {row['email']: row['role'] for row in response.json()['results']}
+        self.assertEqual(roles[self.member.email], 'Administrador do Sistema')
+
+    def test_write_seen_by_a_worker_with_another_cache(self):
+        etag = self.get_etag()
+
+        # Outro processo grava sem passar por este cache.
+        self.member.first_name = 'Outro'
+        self.member.save()
+        cache.clear()
+
+        self.assertEqual(self.revalidate(etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_survives_a_cache_loss_without_writes(self):
+        etag = self.get_etag()
+        cache.clear()
+
+        self.assertEqual(self.revalidate(etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_membership_delete_changes_the_etag(self):
+        etag = self.get_etag()
+
+        Membership.objects.filter(user=self.member).delete()
+
+        self.assertEqual(self.revalidate(etag).status_code, status.HTTP_200_OK)
+
+
+class MemberListQueryTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.owner.email)
+
+    def test_authentication_loads_user_organization_and_role_together(self):
+        # Usuário, organização ativa e papel em um SELECT; o outro é a página.
+        with self.assertNumQueries(2):
+            response = self.client.get(MEMBERS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(MEMBERS_URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def add_members(self, count):
+        start = Membership.objects.filter(organization=self.organization).count()
+        for index in range(start, start + count):
+            self.create_member(f'membro{index}@example.com')
+
+    def test_page_cost_does_not_grow_with_members(self):
+        self.add_members(3)
+        with self.assertNumQueries(2):
+            response = self.client.get(MEMBERS_URL)
+        self.assertEqual(len(response.json()['results']), 5)
+
+        self.add_members(45)
+        with self.assertNumQueries(2):
+            response = self.client.get(MEMBERS_URL)
+        self.assertEqual(len(response.json()['results']), 50)
+
+    def test_cursor_walks_every_member_once(self):
+        self.add_members(3)
+
+        first = self.client.get(MEMBERS_URL, {'page_size': 3}).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+        emails = [row['email'] for row in first['results'] + second['results']]
+        self.assertEqual(len(emails), 5)
+        self.assertEqual(set(emails), set(
+            Membership.objects.filter(organization=self.organization).values_list('user__email', flat=True)
+        ))
+
+    def stream(self):
+        response = self.client.get(MEMBERS_URL, {'stream': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(b''.join(response.streaming_content))
+
+    @mock.patch('accounts.views.STREAM_CHUNK_SIZE', 10)
+    def test_stream_reads_every_member_in_one_query(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.stream()), 2)
+
+        self.add_members(58)
+        with self.assertNumQueries(2):
+            rows = self.stream()
+
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(len({row['email'] for row in rows}), 60)
+
+    def test_inactive_membership_is_refused(self):
+        self.authenticate(self.member.email)
+        Membership.objects.filter(user=self.member).update(is_active=False)
+
+        response = self.client.get(MEMBERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MemberCreateTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.owner.email)
+
+    def create(self, email):
+        return self.client.post(
+            MEMBERS_URL, {'full_name': 'Nova Pessoa', 'email': email, 'password': PASSWORD}, format='json'
+        )
+
+    def test_create_statements(self):
+        # Autenticação, e no savepoint: usuário, associação e versão da listagem.
+        with self.assertNumQueries(6):
+            response = self.create('nova@example.com')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertTrue(Membership.objects.filter(
+            user__email='nova@example.com', organization=self.organization
+        ).exists())
+
+    def test_taken_email_answers_400_without_partial_rows(self):
+        users = User.objects.count()
+        memberships = Membership.objects.count()
+
+        response = self.create(self.member.email)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+        self.assertEqual((User.objects.count(), Membership.objects.count()), (users, memberships))
+
+
+class AsyncMemberViewTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {'Authorization': f'Bearer {self.login(self.owner.email)["access"]}'}
+
+    async def create(self, email, headers=None):
+        return await self.async_client.post(
+            ASYNC_MEMBERS_URL,
+            {'full_name': 'Nova Pessoa', 'email': email, 'password': PASSWORD},
+            content_type='application/json',
+            headers=self.headers if headers is None else headers
+        )
+
+    async def test_create(self):
+        response = await self.create('nova@example.com')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertTrue(await Membership.objects.filter(
+            user__email='nova@example.com', organization=self.organization
+        ).aexists())
+
+    async def test_create_with_a_taken_email_answers_400(self):
+        response = await self.create(self.member.email)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+
+    async def test_create_requires_authentication(self):
+        response = await self.create('nova@example.com', headers={})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(await User.objects.filter(email='nova@example.com').aexists())
+
+    async def test_plain_member_cannot_create(self):
+        tokens = await sync_to_async(self.login)(self.member.email)
+
+        response = await self.create('nova@example.com', headers={'Authorization': f'Bearer {tokens["access"]}'})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_list_and_revalidate(self):
+        response = await self.async_client.get(ASYNC_MEMBERS_URL, headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = json.loads(b''.join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual({row['email'] for row in rows}, {self.owner.email, self.member.email})
+
+        response = await self.async_client.get(
+            ASYNC_MEMBERS_URL, headers={**self.headers, 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_list_requires_authentication(self):
+        response = await self.async_client.get(ASYNC_MEMBERS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class MemberSearchTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.owner.email)
+        user = self.create_member('conceicao@example.com')
+        # O UPDATE direto passa pelo trigger que mantém o índice de busca.
+        User.objects.filter(pk=user.pk).update(first_name='José', last_name='Conceição')
+
+    def search(self, **params):
+        response = self.client.get(MEMBERS_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['email'] for row in response.json()['results']]
+
+    def test_search_matches_prefixes_without_accents(self):
+        self.assertEqual(self.search(q='conceicao jo'), ['conceicao@example.com'])
+
+    def test_search_and_role_filter(self):
+        self.assertEqual(self.search(q='example', role='owner'), [self.owner.email])
+
+
+class BulkImportTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.owner.email)
+
+    def upload(self, content, encoding):
+        csv_file = SimpleUploadedFile('membros.csv', content.encode(encoding), content_type='text/csv')
+        return self.client.post(BULK_IMPORT_URL, {'file': csv_file}, format='multipart')
+
+    def test_report_has_one_entry_per_row(self):
+        rows = [
+            {'email': 'nova@example.com', 'full_name': 'Nova Pessoa', 'password': PASSWORD},
+            {'email': 'invalido', 'full_name': 'Sem Email', 'password': PASSWORD},
+            {'email': self.member.email, 'full_name': 'Já Existe', 'password': PASSWORD},
+            {'email': 'nova@example.com', 'full_name': 'Repetida', 'password': PASSWORD},
+        ]
+
+        response = self.client.post(BULK_IMPORT_URL, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        body = response.json()
+        self.assertEqual((body['created'], body['errors']), (1, 3))
+        self.assertEqual([entry['row'] for entry in body['results']], [1, 2, 3, 4])
+        self.assertEqual(
+            [entry['status'] for entry in body['results']],
+            ['created', 'error', 'error', 'error']
+        )
+        self.assertIn('email', body['results'][1]['errors'])
+        user = User.objects.get(email='nova@example.com')
+        self.assertEqual(body['results'][0]['id'], user.pk)
+        self.assertTrue(Membership.objects.filter(user=user, organization=self.organization).exists())
+
+    def test_only_errors_answers_400(self):
+        response = self.client.post(BULK_IMPORT_URL, [{'email': 'invalido'}], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['created'], 0)
+
+    def test_csv_exported_as_windows_1252(self):
+        content = f'email,full_name,password\r\njose@example.com,José Conceição,{PASSWORD}\r\n'
+
+        response = self.upload(content, 'cp1252')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        user = User.objects.get(email='jose@example.com')
+        self.assertEqual((user.first_name, user.last_name), ('José', 'Conceição'))
+
+    def test_csv_with_bom(self):
+        content = f'email,full_name,password\njoao@example.com,João Silva,{PASSWORD}\n'
+
+        response = self.upload(content, 'utf-8-sig')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+
+    def test_unreadable_file_answers_400(self):
+        csv_file = SimpleUploadedFile('membros.csv', b'email,full_name\n\x81\x8d,x\n', content_type='text/csv')
+
+        response = self.client.post(BULK_IMPORT_URL, {'file': csv_file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', response.json())
+
+    def test_malformed_csv_answers_400(self):
+        content = 'email,full_name,password\n"' + 'x' * 200000 + '",Nome,senha\n'
+
+        response = self.upload(content, 'utf-8')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', response.json())
+
+
+class OwnerCountTests(AuthTestCase):
+    """`Organization.owner_count` acompanha cada caminho que altera proprietários"""
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.owner.email)
+
+    def owner_count(self):
+        self.organization.refresh_from_db(fields=['owner_count'])
+        return self.organization.owner_count
+
+    def patch(self, user, **data):
+        return self.client.patch(f'{MEMBERS_URL}{user.pk}/', data, format='json')
+
+    def bulk_update(self, users, **data):
+        return self.client.post(BULK_UPDATE_URL, {'ids': [user.pk for user in users], **data}, format='json')
+
+    def test_promote_and_demote_one_member(self):
+        self.assertEqual(self.patch(self.member, role='owner').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.owner_count(), 2)
+
+        self.assertEqual(self.patch(self.member, role='member').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.owner_count(), 1)
+
+    def test_last_owner_cannot_be_demoted(self):
+        response = self.patch(self.owner, role='manager')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.owner_count(), 1)
+        self.assertEqual(Membership.objects.get(user=self.owner).role, Membership.Roles.OWNER)
+
+    def test_bulk_demote_keeps_one_owner(self):
+        second = self.create_member('second@example.com', Membership.Roles.OWNER)
+        third = self.create_member('third@example.com', Membership.Roles.OWNER)
+        Organization.objects.filter(pk=self.organization.pk).update(owner_count=3)
+
+        response = self.bulk_update([second, third], role='member')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(self.owner_count(), 1)
+
+    def test_bulk_deactivate_of_every_owner_is_refused(self):
+        second = self.create_member('second@example.com', Membership.Roles.OWNER)
+        Organization.objects.filter(pk=self.organization.pk).update(owner_count=2)
+
+        response = self.bulk_update([self.owner, second, self.member], status=False)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.owner_count(), 2)
+        self.assertFalse(Membership.objects.filter(organization=self.organization, is_active=False).exists())
+
+    def test_bulk_reactivate_counts_owners_back(self):
+        second = self.create_member('second@example.com', Membership.Roles.OWNER)
+        Organization.objects.filter(pk=self.organization.pk).update(owner_count=2)
+        self.bulk_update([second], status=False)
+        self.assertEqual(self.owner_count(), 1)
+
+        self.bulk_update([second], status=True)
+
+        self.assertEqual(self.owner_count(), 2)
+
+    def test_deleting_an_owner_membership(self):
+        second = self.create_member('second@example.com', Membership.Roles.OWNER)
+        Organization.objects.filter(pk=self.organization.pk).update(owner_count=2)
+
+        Membership.objects.get(user=second).delete()
+
+        self.assertEqual(self.owner_count(), 1)
+
+    def test_import_of_owners(self):
+        rows = [
+            {'email': f'dono{index}@example.com', 'full_name': 'Dono', 'password': PASSWORD, 'role': 'owner'}
+            for index in range(2)
+        ] + [{'email': 'membro@example.com', 'full_name': 'Membro', 'password': PASSWORD}]
+
+        response = self.client.post(BULK_IMPORT_URL, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(self.owner_count(), 3)
+
+    def test_create_organization_counts_its_owner(self):
+        response = self.client.post('/api/v1/create-organization/', {
+            'name': 'Nova',
+            'organization_id': '3',
+            'user_id': str(self.member.user_id),
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        organization = Organization.objects.get(name='Nova')
+        self.assertEqual(organization.owner_count, 1)
+        self.assertTrue(Membership.objects.filter(
+            user=self.member, organization=organization, role=Membership.Roles.OWNER
+        ).exists())
+
+
+@override_settings(REQUEST_METRICS={'SAMPLE_RATE': 1.0, 'SLOW_REQUEST_MS': 60000, 'DUPLICATE_QUERY_THRESHOLD': 2})
+class RequestMetricsTests(AuthTestCase):
+
+    def test_server_timing_reports_queries_and_marked_sections(self):
+        self.authenticate(self.owner.email)
+
+        response = self.client.get(MEMBERS_URL)
+
+        timing = response['Server-Timing']
+        self.assertIn('desc="2 queries"', timing)
+        self.assertIn('desc="0 duplicated queries"', timing)
+        self.assertIn('serializer;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_repeated_queries_are_logged(self):
+        def view(request):
+            for _ in range(3):
+                list(Organization.objects.filter(pk=self.organization.pk))
+            return HttpResponse()
+
+        with self.assertLogs('config.request_metrics', 'WARNING') as logs:
+            response = RequestMetricsMiddleware(view)(RequestFactory().get('/repetida/'))
+
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['event'], record['path']), ('duplicate_queries', '/repetida/'))
+        self.assertEqual((record['queries'], record['duplicated_queries']), (3, 2))
+        self.assertEqual(record['top_duplicates'][0]['count'], 3)
+
+
+class RequestProfilerTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(REQUEST_PROFILER={
+            'TOKEN': 'segredo',
+            'DIRECTORY': self.directory,
+            'MAX_FILES_PER_ENDPOINT': 3,
+            'MAX_AGE_HOURS': 1,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.authenticate(self.owner.email)
+
+    def profile(self):
+        response = self.client.get(MEMBERS_URL, HTTP_X_PROFILE='segredo')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response['X-Profile-File']
+
+    def test_profile_is_written_per_endpoint(self):
+        relative_path = self.profile()
+
+        self.assertTrue(relative_path.startswith('GET_api_v1_accounts_members'))
+        self.assertGreater(os.path.getsize(os.path.join(self.directory, relative_path)), 0)
+        self.assertNotIn('X-Profile-File', self.client.get(MEMBERS_URL))
+
+    def test_stored_profiles_are_capped(self):
+        paths = [self.profile() for _ in range(5)]
+
+        endpoint = os.path.join(self.directory, os.path.dirname(paths[0]))
+        self.assertEqual(len(os.listdir(endpoint)), 3)
+
+    def test_profiles_older_than_max_age_are_removed(self):
+        endpoint = os.path.join(self.directory, os.path.dirname(self.profile()))
+        # O nome ordena antes dos demais: só a idade o remove.
+        old = os.path.join(endpoint, '99991231T235959-1ms-antigo.prof')
+        open(old, 'w').close()
+        two_hours_ago = time.time() - 7200
+        os.utime(old, (two_hours_ago, two_hours_ago))
+
+        self.profile()
+
+        self.assertFalse(os.path.exists(old))
+        self.assertEqual(len(os.listdir(endpoint)), 2)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrganizationMemberViewSet
+from .views import AsyncOrganizationMemberView, OrganizationMemberViewSet
 
 router = DefaultRouter()
 router.register(r'members', OrganizationMemberViewSet, basename='organization-members')
@@ -8,5 +8,6 @@ router.register(r'members', OrganizationMemberViewSet, basename='organization-me
 app_name = 'accounts'
 
 urlpatterns = [
+    path('async/members/', AsyncOrganizationMemberView.as_view(), name='organization-members-async'),
     path('', include(router.urls)),
-]
\ No newline at end of file
+]
@@ -1,15 +1,53 @@
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status, mixins
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, ValidationError
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.db.models import Prefetch
+from django.db import IntegrityError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from auth.authentication import aauthenticate_jwt
+from auth.hashing import amake_password
 from auth.models import Membership, Organization
-from .serializers import OrganizationMemberSerializer
+from auth.throttling import PasswordHashAdmissionMixin
+from auth.views import AsyncJSONView
+from config.metrics import timing
+from .cache import (
+    aget_member_list_version,
+    get_cached_member_list,
+    get_member_list_version,
+    member_list_etag,
+    member_list_key,
+    set_cached_member_list,
+)
+from .bulk import MAX_IMPORT_ROWS, import_members, read_import_rows, update_members
+from .filters import filter_members
+from .pagination import MemberCursorPagination
+from .permissions import (
+    IsOrgMember,
+    IsOrgManagerOrOwner,
+    NoActiveOrganization,
+    aresolve_membership,
+    get_request_membership,
+)
+from .serializers import (
+    MemberBulkUpdateSerializer,
+    MemberFilterSerializer,
+    MemberImportSerializer,
+    OrganizationMemberSerializer,
+)
+from .streaming import STREAM_CHUNK_SIZE, astream_json_array, stream_json_array
 
 User = get_user_model()
 
 
-class OrganizationMemberViewSet(mixins.ListModelMixin,
+class OrganizationMemberViewSet(PasswordHashAdmissionMixin,
+                                mixins.ListModelMixin,
                                 mixins.CreateModelMixin,
                                 mixins.UpdateModelMixin,
                                 viewsets.GenericViewSet):
@@ -17,168 +55,353 @@ class OrganizationMemberViewSet(mixins.ListModelMixin,
     ViewSet para gerenciar membros da organização ativa do usuário.
     
     Endpoints disponíveis:
-    - GET /accounts/members/ - Lista membros da organização ativa do usuário
+    - GET /accounts/members/ - Lista membros da organização ativa do usuário (paginado por cursor)
+    - GET /accounts/members/?q=&role=&status= - Busca e filtra os membros listados
+    - GET /accounts/members/?stream=1 - Lista todos os membros em uma resposta enviada em partes
     - POST /accounts/members/ - Cria um novo membro na organização ativa do usuário
     - PUT /accounts/members/{id}/ - Atualiza completamente um membro (todos os campos)
     - PATCH /accounts/members/{id}/ - Atualiza parcialmente um membro (apenas campos enviados)
+    - POST /accounts/members/bulk/ - Importa membros em lote (array JSON ou arquivo CSV)
+    - POST /accounts/members/bulk-update/ - Altera o papel e/ou a situação de vários membros
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOrgMember]
+    manager_actions = ['create', 'update', 'partial_update', 'bulk_import', 'bulk_update']
+    password_hash_actions = ['create', 'bulk_import']
+    lookup_field = 'user_id'
+    lookup_url_kwarg = 'pk'
+    pagination_class = MemberCursorPagination
+    
+    def get_permissions(self):
+        """Ações de escrita exigem OWNER ou MANAGER na organização ativa"""
+        if self.action in self.manager_actions:
+            return [IsAuthenticated(), IsOrgManagerOrOwner()]
+        return super().get_permissions()
     
     def get_organization(self):
-        """Retorna a organização ativa do usuário"""
-        if not hasattr(self.request.user, 'org_active') or not self.request.user.org_active:
+        """Retorna a organização ativa do usuário, resolvida junto com a associação"""
+        membership = get_request_membership(self.request)
+        if membership is None:
             return None
-        return self.request.user.org_active
+        return membership.organization
     
     def get_queryset(self):
-        """Retorna apenas usuários da organização ativa do usuário"""
+        """
+        Retorna as associações da organização ativa do usuário com o usuário
+        carregado no mesmo JOIN, evitando uma consulta por membro.
+        """
         organization = self.get_organization()
         
         if not organization:
-            return User.objects.none()
-        
-        return User.objects.filter(
-            membership__organization=organization
-        ).prefetch_related(
-            Prefetch(
-                'membership_set',
-                queryset=Membership.objects.filter(organization=organization),
-                to_attr='current_membership'
-            )
-        ).distinct()
+            return Membership.objects.none()
+        
+        return Membership.objects.filter(
+            organization=organization
+        ).select_related('user')
     
     serializer_class = OrganizationMemberSerializer
     
+    def filter_queryset(self, queryset):
+        """Aplica a busca e os filtros da query string à listagem"""
+        if self.action != 'list':
+            return queryset
+        return filter_members(queryset, **get_member_filters(self.request.GET))
+    
     def get_serializer_context(self):
         """Adiciona a organização no contexto do serializer"""
         context = super().get_serializer_context()
         context['organization'] = self.get_organization()
         return context
     
+    @extend_schema(
+        parameters=[
+            MemberFilterSerializer,
+            OpenApiParameter(
+                'stream',
+                OpenApiTypes.BOOL,
+                description='Retorna todos os membros em um único array JSON enviado em partes, sem paginação'
+            ),
+        ]
+    )
     def list(self, request, *args, **kwargs):
-        """Lista todos os membros da organização ativa do usuário"""
+        """
+        Lista todos os membros da organização ativa do usuário.
+        
+        Cada página serializada fica em cache sob a versão atual da listagem
+        da organização (`Organization.member_list_version`), incrementada
+        pelos sinais de `accounts.signals` a cada alteração. O ETag deriva da
+        mesma versão: um `If-None-Match` ainda válido recebe 304 sem consultar
+        as associações, e uma página repetida custa uma leitura de cache. Com `?stream=1`, a lista completa é enviada em partes.
+        A busca e os filtros fazem parte da URL, e portanto da chave e do ETag.
+        """
         organization = self.get_organization()
+        version = get_member_list_version(organization)
         
-        if not organization:
-            return Response(
-                {'detail': 'Usuário não possui organização ativa'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        etag = member_list_etag(organization.pk, version, request.get_full_path())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return add_validator_headers(not_modified, etag)
         
-        try:
-            membership = Membership.objects.get(
-                user=request.user, 
-                organization=organization,
-                is_active=True
-            )
-        except Membership.DoesNotExist:
-            return Response(
-                {'detail': 'Usuário não é membro da organização'},
-                status=status.HTTP_403_FORBIDDEN
-            )
+        if self.is_streaming():
+            return add_validator_headers(self.stream_list(), etag)
+        
+        cache_key = member_list_key(organization.pk, version, request.build_absolute_uri())
+        data = get_cached_member_list(cache_key)
+        if data is None:
+            data = self.serialize_list()
+            set_cached_member_list(cache_key, data)
         
+        return add_validator_headers(Response(data), etag)
+    
+    def serialize_list(self):
+        """Monta o corpo da listagem (paginado ou não) como na ListModelMixin"""
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            with timing('serializer'):
+                data = serializer.data
+            return self.get_paginated_response(data).data
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        with timing('serializer'):
+            return serializer.data
+    
+    def is_streaming(self):
+        return self.request.query_params.get('stream', '').lower() in ('1', 'true')
+    
+    def stream_list(self):
+        """
+        Envia todos os membros, sem paginação, como um array JSON em partes.
+        
+        O queryset é percorrido com `.iterator()` e cada associação é
+        serializada e enviada em seguida, então a memória usada não cresce com
+        o tamanho da organização. A resposta não passa pelo cache.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        serializer = self.get_serializer()
+        rows = (
+            serializer.to_representation(membership)
+            for membership in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+        return StreamingHttpResponse(stream_json_array(rows), content_type='application/json')
     
     def create(self, request, *args, **kwargs):
         """Cria um novo membro na organização ativa do usuário"""
-        organization = self.get_organization()
-        
-        if not organization:
-            return Response(
-                {'detail': 'Usuário não possui organização ativa'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        try:
-            membership = Membership.objects.get(
-                user=request.user, 
-                organization=organization,
-                is_active=True
-            )
-            if membership.role not in [Membership.Roles.OWNER, Membership.Roles.MANAGER]:
-                return Response(
-                    {'detail': 'Sem permissão para adicionar membros. Apenas OWNER e MANAGER podem adicionar membros.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-        except Membership.DoesNotExist:
-            return Response(
-                {'detail': 'Usuário não é membro da organização'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         
-        headers = self.get_success_headers(serializer.data)
+        with timing('serializer'):
+            data = serializer.data
+        headers = self.get_success_headers(data)
         return Response(
-            serializer.data, 
+            data, 
             status=status.HTTP_201_CREATED, 
             headers=headers
         )
     
     def update(self, request, *args, **kwargs):
         """Atualiza um membro da organização ativa do usuário"""
-        organization = self.get_organization()
+        target_membership = self.get_object()
+        instance = target_membership.user
+        instance.current_membership = [target_membership]
         
-        if not organization:
+        partial = kwargs.pop('partial', False)
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        
+        with timing('serializer'):
+            data = serializer.data
+        headers = self.get_success_headers(data)
+        return Response(
+            data, 
+            status=status.HTTP_200_OK, 
+            headers=headers
+        )
+    
+    @extend_schema(
+        request=MemberImportSerializer(many=True),
+        responses={201: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_import(self, request, *args, **kwargs):
+        """
+        Importa membros em lote na organização ativa do usuário.
+        
+        Aceita um array JSON de objetos com email, full_name, password e role,
+        ou um arquivo CSV com as mesmas colunas no campo `file`. Retorna o
+        resultado de cada linha; linhas com erro não impedem as demais.
+        """
+        rows = read_import_rows(request)
+        
+        if rows is None:
             return Response(
-                {'detail': 'Usuário não possui organização ativa'},
+                {'detail': 'Envie um array JSON de membros ou um arquivo CSV no campo "file".'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            membership = Membership.objects.get(
-                user=request.user, 
-                organization=organization,
-                is_active=True
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response(
+                {'detail': f'A importação aceita no máximo {MAX_IMPORT_ROWS} linhas.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            if membership.role not in [Membership.Roles.OWNER, Membership.Roles.MANAGER]:
-                return Response(
-                    {'detail': 'Sem permissão para atualizar membros. Apenas OWNER e MANAGER podem atualizar membros.'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-        except Membership.DoesNotExist:
+        
+        try:
+            report = import_members(self.get_organization(), rows)
+        except IntegrityError:
             return Response(
-                {'detail': 'Usuário não é membro da organização'},
-                status=status.HTTP_403_FORBIDDEN
+                {'detail': 'Conflito ao gravar os membros. Verifique se algum email foi cadastrado durante a importação e tente novamente.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        instance = self.get_object()
-        
-        if 'role' in request.data and instance == request.user:
-            try:
-                target_membership = Membership.objects.get(user=instance, organization=organization)
-                if target_membership.role == Membership.Roles.OWNER:
-                    owners_count = Membership.objects.filter(
-                        organization=organization, 
-                        role=Membership.Roles.OWNER,
-                        is_active=True
-                    ).count()
-                    if owners_count <= 1:
-                        return Response(
-                            {'detail': 'Não é possível alterar o role do último proprietário da organização'},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-            except Membership.DoesNotExist:
-                pass
+        created = sum(1 for entry in report if entry['status'] == 'created')
+        return Response(
+            {
+                'created': created,
+                'errors': len(report) - created,
+                'results': report
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+        )
+    
+    @extend_schema(
+        request=MemberBulkUpdateSerializer,
+        responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT}
+    )
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Altera o papel e/ou a situação de vários membros da organização ativa.
         
-        partial = kwargs.pop('partial', False)
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        Recebe os ids dos membros e o `role` e/ou `status` a aplicar; a
+        alteração é um único UPDATE, recusado por inteiro se deixaria a
+        organização sem proprietário ativo. Ids que não pertencem à
+        organização são devolvidos em `not_found`.
+        """
+        serializer = MemberBulkUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
         
-        headers = self.get_success_headers(serializer.data)
-        return Response(
-            serializer.data, 
-            status=status.HTTP_200_OK, 
-            headers=headers
+        data = serializer.validated_data
+        updated, missing = update_members(
+            self.get_organization(),
+            data['ids'],
+            role=data.get('role'),
+            status=data.get('status')
+        )
+        return Response({'updated': updated, 'not_found': missing})
+
+
+class AsyncOrganizationMemberView(AsyncJSONView):
+    """
+    Lista e cria membros da organização ativa do usuário (versão assíncrona).
+    
+    Mesmas regras de /accounts/members/, mas roda nativamente sob ASGI:
+    consultas pelo ORM assíncrono, listagem enviada em partes e hash da senha
+    no executor limitado.
+    """
+    http_method_names = ['get', 'post', 'options']
+    
+    async def get(self, request):
+        """
+        Envia todos os membros como um array JSON em partes, como `?stream=1`,
+        com a mesma busca e os mesmos filtros da listagem síncrona.
+        
+        As associações são lidas com `.aiterator()` e serializadas à medida
+        que chegam, sem ocupar uma thread durante o envio. O ETag deriva da
+        mesma versão da listagem síncrona, então um `If-None-Match` válido
+        recebe 304 sem consultar as associações.
+        """
+        membership, error = await self.authorize(request)
+        if error is not None:
+            return error
+        
+        organization = membership.organization
+        version = await aget_member_list_version(organization)
+        etag = member_list_etag(organization.pk, version, request.get_full_path())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return add_validator_headers(not_modified, etag)
+        
+        try:
+            filters = get_member_filters(request.GET)
+        except ValidationError as e:
+            return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = Membership.objects.filter(organization_id=organization.pk)
+        if filters.get('q'):
+            # A busca consulta o índice de usuários ao montar o filtro.
+            queryset = await sync_to_async(filter_members)(queryset, **filters)
+        else:
+            queryset = filter_members(queryset, **filters)
+        queryset = queryset.select_related('user').order_by('id')
+        serializer = OrganizationMemberSerializer(context={'organization': organization})
+        rows = (
+            serializer.to_representation(row)
+            async for row in queryset.aiterator(chunk_size=STREAM_CHUNK_SIZE)
         )
+        response = StreamingHttpResponse(astream_json_array(rows), content_type='application/json')
+        return add_validator_headers(response, etag)
+    
+    async def handle(self, request, data):
+        membership, error = await self.authorize(request, manager=True)
+        if error is not None:
+            return error
+        
+        serializer = OrganizationMemberSerializer(
+            data=data,
+            context={'organization': membership.organization}
+        )
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        password_hash = await amake_password(serializer.validated_data['password'])
+        try:
+            await sync_to_async(serializer.save)(password_hash=password_hash)
+        except ValidationError as e:
+            return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        
+        return JsonResponse(serializer.data, status=status.HTTP_201_CREATED)
+    
+    async def authorize(self, request, manager=False):
+        """
+        Autentica o token e resolve a associação com a organização ativa.
+        
+        Retorna `(associação, None)` ou `(None, resposta de erro)`, com as
+        mesmas respostas das permissões das views DRF.
+        """
+        try:
+            user = await aauthenticate_jwt(request)
+        except (AuthenticationFailed, InvalidToken) as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return None, JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        
+        if user is None:
+            return None, JsonResponse({'detail': NotAuthenticated.default_detail}, status=status.HTTP_401_UNAUTHORIZED)
+        
+        if not getattr(user, 'org_active_id', None):
+            return None, JsonResponse({'detail': NoActiveOrganization.default_detail}, status=status.HTTP_400_BAD_REQUEST)
+        
+        membership = await aresolve_membership(user)
+        if membership is None:
+            return None, JsonResponse({'detail': IsOrgMember.message}, status=status.HTTP_403_FORBIDDEN)
+        if manager and membership.role not in [Membership.Roles.OWNER, Membership.Roles.MANAGER]:
+            return None, JsonResponse({'detail': IsOrgManagerOrOwner.message}, status=status.HTTP_403_FORBIDDEN)
+        
+        return membership, None
+
+
+def get_member_filters(params):
+    """Valida `?q=`, `?role=` e `?status=`; parâmetros inválidos resultam em 400"""
+    serializer = MemberFilterSerializer(data=params.dict())
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def add_validator_headers(response, etag):
+    """Validadores da listagem: ETag, revalidação obrigatória e cache apenas no cliente"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -1,23 +1,144 @@
+from django import forms
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 from .models import User, Organization, Membership
+from .owners import LastOwnerError, is_owner, save_membership
+from .search import search_organizations, search_users
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginador do admin que conta no máximo `count_limit` linhas.
+
+    O COUNT(*) de uma tabela com milhões de linhas custa uma varredura
+    completa a cada página. Aqui a contagem para no limite, e as páginas
+    seguem disponíveis até ele; para ir além, use a busca ou os filtros.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.count_limit].count()
+
+    def page(self, number):
+        """
+        Busca primeiro só os ids da página e depois as linhas completas: com
+        uma busca ampla, o banco ordena ids em vez das linhas com os JOINs
+        de `list_select_related`.
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        ids = list(self.object_list.values_list('pk', flat=True)[bottom:top])
+        return self._get_page(self.object_list.filter(pk__in=ids), number, self)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist sem COUNT(*) completo, para tabelas grandes"""
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+
+class UserSearchMixin:
+    """
+    Busca do admin pelo índice de usuários (`auth.search`): prefixos das
+    palavras do email, nome e sobrenome, em vez de `icontains` na tabela.
+    """
+    user_search_field = 'pk'
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_users(queryset, search_term, field=self.user_search_field), False
+
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(UserSearchMixin, LargeTableAdmin):
     list_display = ('email', 'first_name', 'last_name', 'is_staff', 'is_active', 'org_active')
+    list_select_related = ('org_active',)
     search_fields = ('email', 'first_name', 'last_name')
+    search_help_text = 'Início das palavras do email, nome ou sobrenome'
     list_filter = ('is_staff', 'is_active')
     ordering = ('email',)
+    autocomplete_fields = ('org_active',)
+
+    def formfield_for_manytomany(self, db_field, request=None, **kwargs):
+        # O rótulo de cada permissão inclui o content type: um JOIN em vez de uma consulta por opção.
+        if db_field.name == 'user_permissions':
+            queryset = kwargs.get('queryset', db_field.remote_field.model.objects)
+            kwargs['queryset'] = queryset.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request=request, **kwargs)
 
 @admin.register(Organization)
-class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'organization_id', 'is_active')
+class OrganizationAdmin(LargeTableAdmin):
+    list_display = ('name', 'email', 'organization_id', 'is_active', 'members')
     search_fields = ('name', 'email', 'organization_id')
+    search_help_text = 'Início do nome, email ou CNPJ/CPF, ou a chave da organização'
     list_filter = ('is_active',)
     ordering = ('name',)
+    readonly_fields = ('owner_count',)
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_organizations(queryset, search_term), False
+
+    @admin.display(description='membros')
+    def members(self, obj):
+        # Filtra as associações pelo índice (organização, id), sem contar os membros.
+        url = reverse('admin:custom_auth_membership_changelist')
+        return format_html('<a href="{}?organization={}">ver membros</a>', url, obj.pk)
+
+class MembershipAdminForm(forms.ModelForm):
+
+    class Meta:
+        model = Membership
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        instance = self.instance
+        if instance.pk and is_owner(instance.role, instance.is_active):
+            will_be_owner = is_owner(
+                cleaned_data.get('role', instance.role),
+                cleaned_data.get('is_active', instance.is_active)
+            )
+            if not will_be_owner and instance.organization.owner_count <= 1:
+                raise forms.ValidationError(LastOwnerError.default_detail)
+        return cleaned_data
 
 @admin.register(Membership)
-class MembershipAdmin(admin.ModelAdmin):
+class MembershipAdmin(UserSearchMixin, LargeTableAdmin):
+    form = MembershipAdminForm
     list_display = ('user', 'organization', 'role', 'is_active', 'created', 'updated')
-    search_fields = ('user__email', 'organization__name')
+    list_select_related = ('user', 'organization')
+    search_fields = ('user__email', 'user__first_name', 'user__last_name', 'organization__name')
+    search_help_text = (
+        'Início das palavras do email, nome ou sobrenome do usuário, ou do nome, '
+        'email ou CNPJ/CPF da organização, ou a chave da organização'
+    )
+    user_search_field = 'user'
     list_filter = ('role', 'is_active')
-    ordering = ('-created',)
+    # `created` não é indexado; o id segue a mesma ordem e usa a chave primária.
+    ordering = ('-id',)
+    autocomplete_fields = ('user', 'organization')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Associações do usuário ou da organização buscados, cada lado pelo seu índice"""
+        if not search_term.strip():
+            return queryset, False
+        users, _ = super().get_search_results(request, queryset, search_term)
+        organizations = queryset.filter(
+            organization__in=search_organizations(Organization.objects.all(), search_term).values('pk')
+        )
+        return users | organizations, False
+
+    def get_readonly_fields(self, request, obj=None):
+        # Trocar usuário ou organização de uma associação existente deixaria o owner_count inconsistente.
+        if obj is not None:
+            return ('user', 'organization')
+        return ()
+
+    def save_model(self, request, obj, form, change):
+        save_membership(obj)
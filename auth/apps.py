@@ -1,7 +1,31 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def restore_user_search(sender, using, **kwargs):
+    """Recria os triggers da busca descartados quando uma migração recria a tabela de usuários"""
+    from .search import USER_SEARCH_TABLE, install_user_search
+    connection = connections[using]
+    if USER_SEARCH_TABLE in connection.introspection.table_names():
+        install_user_search(connection)
 
 
 class AuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth'
     label = 'custom_auth'
+
+    def ready(self):
+        if settings.JWT_STATELESS_AUTH and isinstance(caches['default'], LocMemCache):
+            # Cada processo teria a própria cópia das versões dos tokens, e
+            # uma revogação só valeria no worker que a gravou.
+            raise ImproperlyConfigured(
+                'JWT_STATELESS_AUTH exige um cache compartilhado entre os processos (CACHE_BACKEND), não o LocMemCache.'
+            )
+        from . import schema, signals  # noqa: F401
+        post_migrate.connect(restore_user_search, sender=self)
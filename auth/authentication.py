@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .backends import with_active_membership
+from .models import Organization, User
+from .tokens import aget_token_version, get_token_version
+
+
+class ClaimsUser(TokenUser):
+    """
+    Usuário leve montado a partir das claims do token de acesso.
+
+    Expõe `org_active` como uma instância de Organization não persistida, com
+    id, chave e nome vindos do token, o que basta para filtros e chaves
+    estrangeiras sem consultar o banco.
+    """
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def org_active(self):
+        claims = self.token.get('org_active')
+        if not claims:
+            return None
+        return Organization(pk=claims['id'], key=claims['key'], name=claims['name'])
+
+    @cached_property
+    def org_active_id(self):
+        claims = self.token.get('org_active')
+        return claims['id'] if claims else None
+
+
+def get_user_with_membership(user_id):
+    """
+    Carrega o usuário com a organização ativa e a associação com ela em um
+    único SELECT, validando-o como o Simple JWT.
+    """
+    user = with_active_membership(User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})).first()
+    if user is None:
+        raise AuthenticationFailed('Usuário não encontrado', code='user_not_found')
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed('Usuário inativo', code='user_inactive')
+    return user
+
+
+async def aget_user_with_membership(user_id):
+    """Versão assíncrona de `get_user_with_membership`"""
+    user = await with_active_membership(User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})).afirst()
+    if user is None:
+        raise AuthenticationFailed('Usuário não encontrado', code='user_not_found')
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed('Usuário inativo', code='user_inactive')
+    return user
+
+
+class MembershipJWTAuthentication(JWTAuthentication):
+    """
+    Autenticação JWT que carrega, junto com o usuário, a organização ativa e a
+    associação com ela.
+
+    As permissões da API leem a associação já anexada ao usuário, então cada
+    requisição autenticada faz uma única consulta para usuário, organização e
+    papel.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token não contém identificação do usuário') from e
+        return get_user_with_membership(user_id)
+
+
+class StatelessJWTAuthentication(MembershipJWTAuthentication):
+    """
+    Autenticação JWT sem consulta ao banco.
+
+    O usuário da requisição é construído a partir das claims incluídas por
+    `CustomTokenObtainPairSerializer`. A versão gravada no token é comparada
+    com `User.token_version`, incrementada quando o usuário ou suas
+    associações mudam e lida do cache quando possível. Tokens emitidos antes
+    das claims existirem seguem pelo caminho tradicional, carregando o
+    usuário do banco.
+    """
+
+    def get_user(self, validated_token):
+        if 'ver' not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Token não contém identificação do usuário') from e
+
+        if validated_token['ver'] != get_token_version(user_id):
+            raise AuthenticationFailed('Token revogado', code='token_revoked')
+
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+
+async def aauthenticate_jwt(request):
+    """
+    Autentica uma requisição de view assíncrona nativa pelo cabeçalho JWT.
+
+    Segue o mesmo modo configurado para a API: com `JWT_STATELESS_AUTH`, o
+    usuário vem das claims do token; caso contrário, é carregado pelo ORM
+    assíncrono. Retorna None quando não há token e levanta as exceções do
+    Simple JWT quando ele é inválido.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+
+    raw_token = authenticator.get_raw_token(header)
+    if raw_token is None:
+        return None
+
+    validated_token = authenticator.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError as e:
+        raise InvalidToken('Token não contém identificação do usuário') from e
+
+    if settings.JWT_STATELESS_AUTH and 'ver' in validated_token:
+        if validated_token['ver'] != await aget_token_version(user_id):
+            raise AuthenticationFailed('Token revogado', code='token_revoked')
+        return api_settings.TOKEN_USER_CLASS(validated_token)
+
+    return await aget_user_with_membership(user_id)
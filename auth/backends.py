@@ -0,0 +1,70 @@
+import functools
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models import OuterRef, Subquery
+from django.utils.crypto import get_random_string
+
+from .models import Membership, User
+
+
+@functools.cache
+def dummy_password_hash():
+    """Hash de uma senha aleatória, com o hasher padrão, para comparar quando o email não existe"""
+    return make_password(get_random_string(32))
+
+
+def with_active_membership(queryset):
+    """
+    Carrega a organização ativa no mesmo SELECT e anota o papel e a situação
+    da associação com ela, por subconsultas no índice único (usuário,
+    organização).
+    """
+    memberships = Membership.objects.filter(user=OuterRef('pk'), organization=OuterRef('org_active'))
+    return queryset.select_related('org_active').annotate(
+        active_role=Subquery(memberships.values('role')[:1]),
+        active_membership_is_active=Subquery(memberships.values('is_active')[:1]),
+    )
+
+
+def get_active_membership(user):
+    """
+    Associação com a organização ativa a partir das anotações de
+    `with_active_membership`, ou None se o usuário não foi carregado por ela.
+    """
+    if not hasattr(user, 'active_role'):
+        return None
+    if user.active_role is None:
+        return Membership(role=None, is_active=False)
+    return Membership(
+        user_id=user.pk,
+        organization=user.org_active,
+        role=user.active_role,
+        is_active=bool(user.active_membership_is_active)
+    )
+
+
+class EmailBackend(ModelBackend):
+    """
+    Autentica pelo email em um único SELECT, que já traz a organização ativa
+    e a associação com ela para as claims do token.
+
+    Para emails não cadastrados compara a senha com um hash fixo, então a
+    resposta leva o mesmo tempo de uma senha errada.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        user = with_active_membership(User._default_manager.filter(**{User.USERNAME_FIELD: username})).first()
+
+        if user is None:
+            check_password(password, dummy_password_hash())
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
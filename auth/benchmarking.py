@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from . import hashing
+from .throttling import PasswordHashAdmissionMixin
+
+
+@contextmanager
+def test_database():
+    """Cria um banco de teste descartável para os comandos de benchmark"""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def relax_admission_control(concurrency):
+    """
+    Desliga os limites por IP/email e deixa a admissão aceitar a concorrência
+    pedida, para que o benchmark meça o custo dos endpoints e não os 429.
+    """
+    PasswordHashAdmissionMixin.password_hash_throttle_classes = []
+    hashing._hashing_slots = threading.BoundedSemaphore(concurrency)
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por posição mais próxima sobre uma lista já ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
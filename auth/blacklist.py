@@ -0,0 +1,143 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from .models import RevokedToken
+
+# Idade máxima do filtro de Bloom; mais velho que isso, é reconstruído a
+# partir da tabela antes da próxima verificação.
+REBUILD_INTERVAL = 300
+# Taxa de falsos positivos do filtro; cada positivo é confirmado no banco.
+FALSE_POSITIVE_RATE = 0.01
+
+RECENT_REVOCATION_KEY = 'auth:revoked-jti:{}'
+# Revogações recentes ficam no cache até que todo filtro em uso tenha sido
+# construído depois da gravação no banco.
+RECENT_REVOCATION_TIMEOUT = REBUILD_INTERVAL + 60
+
+
+class BloomFilter:
+    """Filtro de Bloom simples sobre um bytearray"""
+
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        capacity = max(capacity, 1024)
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationStore:
+    """
+    Blacklist compacta de refresh tokens.
+
+    A tabela `RevokedToken` guarda apenas JTIs ainda não expirados e é
+    gravada na própria requisição que revoga o token. Com um cache
+    compartilhado entre os processos, cada processo mantém um filtro de Bloom
+    da tabela, reconstruído quando passa de `REBUILD_INTERVAL`: um JTI fora
+    do filtro só precisa ser procurado entre as revogações recentes no cache,
+    sem tocar no banco, e os positivos do filtro são confirmados na tabela.
+    Com um cache local (LocMemCache) a revogação feita em outro processo não
+    apareceria ali, então toda verificação vai ao banco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = None
+
+    def is_revoked(self, jti):
+        if not cache_is_shared():
+            return self._stored(jti)
+
+        bloom = self._current_filter()
+        if bloom is None or jti in bloom:
+            return self._stored(jti)
+
+        return cache.get(RECENT_REVOCATION_KEY.format(jti)) is not None
+
+    def revoke(self, jti, expires_at):
+        remaining = (expires_at - timezone.now()).total_seconds()
+        if remaining <= 0:
+            return
+
+        if cache_is_shared():
+            cache.set(
+                RECENT_REVOCATION_KEY.format(jti),
+                1,
+                timeout=min(remaining, RECENT_REVOCATION_TIMEOUT)
+            )
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at)],
+            ignore_conflicts=True
+        )
+
+    def _stored(self, jti):
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def _current_filter(self):
+        """
+        Retorna o filtro, reconstruindo-o na própria requisição se estiver
+        velho. Enquanto outra thread reconstrói, retorna None e a verificação
+        vai ao banco.
+        """
+        if self._built_at is not None and time.monotonic() - self._built_at < REBUILD_INTERVAL:
+            return self._bloom
+
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self._built_at is None or time.monotonic() - self._built_at >= REBUILD_INTERVAL:
+                self._rebuild()
+        finally:
+            self._lock.release()
+        return self._bloom
+
+    def _rebuild(self):
+        # O instante é tomado antes da leitura: revogações gravadas durante a
+        # reconstrução continuam cobertas pelo cache até o filtro seguinte.
+        built_at = time.monotonic()
+        revoked = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        bloom = BloomFilter(revoked.count() * 2)
+        for jti in revoked.values_list('jti', flat=True).iterator(chunk_size=5000):
+            bloom.add(jti)
+        self._bloom = bloom
+        self._built_at = built_at
+
+    def prune(self, batch_size=5000):
+        """Remove em lotes os registros expirados e retorna quantos foram apagados"""
+        deleted = 0
+        while True:
+            ids = list(
+                RevokedToken.objects.filter(expires_at__lte=timezone.now())
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            deleted += RevokedToken.objects.filter(pk__in=ids).delete()[0]
+
+
+def cache_is_shared():
+    """Indica se o cache padrão é visto por todos os processos"""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+revocation_store = RevocationStore()
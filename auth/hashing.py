@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+# Abaixo deste tamanho não compensa despachar para o pool de processos.
+INLINE_HASHING_THRESHOLD = 8
+
+_process_pool = None
+_thread_pool = None
+_hashing_slots = threading.BoundedSemaphore(settings.PASSWORD_HASHING_CONCURRENCY)
+
+
+def acquire_hashing_slot(blocking=True):
+    """
+    Reserva uma vaga para uma operação de hash de senha neste processo.
+
+    Views síncronas esperam até `PASSWORD_HASHING_QUEUE_TIMEOUT` segundos;
+    views assíncronas não bloqueiam o event loop. Retorna False quando não há
+    capacidade, para que a requisição seja recusada com 429.
+    """
+    if not blocking:
+        return _hashing_slots.acquire(blocking=False)
+    return _hashing_slots.acquire(timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT)
+
+
+def release_hashing_slot():
+    _hashing_slots.release()
+
+
+def _init_hashing_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def get_process_pool():
+    """
+    Retorna o pool de processos compartilhado para hashing de senhas.
+
+    Usa `spawn` para não herdar conexões de banco e threads do processo web.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS,
+            mp_context=get_context('spawn'),
+            initializer=_init_hashing_worker,
+            initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),)
+        )
+    return _process_pool
+
+
+def hash_passwords(passwords):
+    """Gera o hash de uma lista de senhas distribuindo o trabalho entre processos"""
+    passwords = list(passwords)
+    workers = settings.PASSWORD_HASHING_WORKERS
+
+    if workers <= 1 or len(passwords) < INLINE_HASHING_THRESHOLD:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(get_process_pool().map(make_password, passwords, chunksize=chunksize))
+
+
+def get_thread_pool():
+    """
+    Retorna o executor limitado usado pelas views assíncronas.
+
+    O PBKDF2 do hashlib libera o GIL, então threads bastam para tirar o hash
+    do event loop sem custo de serialização entre processos.
+    """
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASHING_WORKERS,
+            thread_name_prefix='password-hashing'
+        )
+    return _thread_pool
+
+
+async def amake_password(password):
+    """Gera o hash da senha no executor limitado, fora do event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), make_password, password)
+
+
+async def acheck_password(password, encoded):
+    """Verifica a senha no executor limitado, fora do event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), check_password, password, encoded)
@@ -0,0 +1,165 @@
+import json
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from auth.benchmarking import percentile, relax_admission_control, test_database
+from auth.models import Membership
+from auth.seeding import Seeder
+
+User = get_user_model()
+
+PASSWORD = 'bench-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência (p50/p95/p99), vazão e número de consultas SQL de cada '
+        'endpoint da API, chamando as views em processo contra um banco de '
+        'teste populado com organizações, usuários e associações.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orgs', type=int, default=3, help='Organizações criadas')
+        parser.add_argument('--members', type=int, default=200, help='Membros por organização')
+        parser.add_argument('--iterations', type=int, default=20, help='Requisições medidas por endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Requisições descartadas antes da medição')
+        parser.add_argument(
+            '--fast-hashing',
+            action='store_true',
+            help='Usa um hasher barato para isolar o custo do restante da requisição'
+        )
+        parser.add_argument('--json', metavar='ARQUIVO', help='Grava o resultado em JSON ("-" para a saída padrão)')
+
+    def handle(self, *args, **options):
+        relax_admission_control(1000)
+
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hashing'] else None
+        with test_database(), override_settings(**({'PASSWORD_HASHERS': hashers} if hashers else {})):
+            self.seed(options['orgs'], options['members'])
+            results = [
+                self.measure(name, request, options['iterations'], options['warmup'])
+                for name, request in self.scenarios()
+            ]
+
+        self.print_table(results)
+
+        if options['json'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def seed(self, orgs, members):
+        """Popula o banco com `orgs` organizações de `members` membros cada"""
+        seeder = Seeder(password=PASSWORD, email_domain='bench.example.com')
+        organizations = seeder.run([(orgs, members, members)])
+
+        owners = Membership.objects.filter(
+            organization=organizations[0], role=Membership.Roles.OWNER
+        ).select_related('user')
+        self.owner = owners[0].user
+        self.member = User.objects.filter(org_active=self.owner.org_active).exclude(pk=self.owner.pk).first()
+
+        # Criar organização troca a organização ativa do usuário; usa alguém fora das demais medições.
+        seeder.create_users(1)
+        self.founder = User.objects.get(email=seeder.email(seeder.users_created - 1))
+
+    def scenarios(self):
+        client = APIClient()
+        tokens = client.post('/api/v1/token/', {'email': self.owner.email, 'password': PASSWORD}, format='json').json()
+        authenticated = APIClient()
+        authenticated.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        state = {'refresh': tokens['refresh'], 'counter': 0}
+
+        def unique(prefix):
+            state['counter'] += 1
+            return f'{prefix}{state["counter"]}-{uuid.uuid4().hex[:8]}@example.com'
+
+        def register():
+            return client.post('/api/v1/register/', {
+                'full_name': 'Bench User', 'email': unique('register'), 'password': PASSWORD
+            }, format='json')
+
+        def token():
+            return client.post('/api/v1/token/', {'email': self.owner.email, 'password': PASSWORD}, format='json')
+
+        def token_refresh():
+            response = client.post('/api/v1/token/refresh/', {'refresh': state['refresh']}, format='json')
+            if response.status_code == 200:
+                state['refresh'] = response.json()['refresh']
+            return response
+
+        def create_organization():
+            return client.post('/api/v1/create-organization/', {
+                'name': 'Bench Org', 'email': 'org@example.com',
+                'organization_id': '00.000.000/0001-00', 'user_id': str(self.founder.user_id)
+            }, format='json')
+
+        def members_list():
+            return authenticated.get('/api/v1/accounts/members/')
+
+        def members_create():
+            return authenticated.post('/api/v1/accounts/members/', {
+                'email': unique('member'), 'full_name': 'Bench Member', 'password': PASSWORD
+            }, format='json')
+
+        def members_update():
+            state['counter'] += 1
+            role = Membership.Roles.MANAGER if state['counter'] % 2 else Membership.Roles.MEMBER
+            return authenticated.patch(f'/api/v1/accounts/members/{self.member.pk}/', {'role': role}, format='json')
+
+        return [
+            ('POST /register/', register),
+            ('POST /token/', token),
+            ('POST /token/refresh/', token_refresh),
+            ('POST /create-organization/', create_organization),
+            ('GET /accounts/members/', members_list),
+            ('POST /accounts/members/', members_create),
+            ('PATCH /accounts/members/{id}/', members_update),
+        ]
+
+    def measure(self, name, request, iterations, warmup):
+        for _ in range(warmup):
+            request()
+
+        latencies = []
+        queries = 0
+        errors = 0
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = request()
+                latencies.append(time.perf_counter() - start)
+            queries += len(context.captured_queries)
+            if response.status_code >= 400:
+                errors += 1
+
+        latencies.sort()
+        total = sum(latencies)
+        return {
+            'endpoint': name,
+            'requests': iterations,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'throughput_rps': round(iterations / total, 1) if total else 0.0,
+            'queries_per_request': round(queries / iterations, 1) if iterations else 0.0,
+        }
+
+    def print_table(self, results):
+        header = f'{"endpoint":<32} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>8} {"queries":>8} {"erros":>6}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for result in results:
+            self.stdout.write(
+                f'{result["endpoint"]:<32} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f} '
+                f'{result["p99_ms"]:>9.2f} {result["throughput_rps"]:>8.1f} '
+                f'{result["queries_per_request"]:>8.1f} {result["errors"]:>6}'
+            )
@@ -0,0 +1,74 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+
+from auth.benchmarking import percentile, relax_admission_control, test_database
+from auth.seeding import Seeder
+
+PASSWORD = 'bench-Passw0rd!'
+
+ENDPOINTS = [
+    ('sync', '/api/v1/token/'),
+    ('async', '/api/v1/async/token/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de login das views síncrona e assíncrona sob '
+        'concorrência, servindo a aplicação ASGI em processo com um banco de teste.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Logins por endpoint')
+        parser.add_argument('--concurrency', type=int, default=16, help='Logins simultâneos')
+        parser.add_argument('--users', type=int, default=50, help='Usuários criados para o teste')
+
+    def handle(self, *args, **options):
+        relax_admission_control(options['concurrency'])
+
+        with test_database():
+            self.seed_users(options['users'])
+            for label, path in ENDPOINTS:
+                result = asyncio.run(self.run_logins(path, options['requests'], options['concurrency'], options['users']))
+                self.report(label, path, result)
+
+    def seed_users(self, count):
+        self.seeder = Seeder(password=PASSWORD, email_domain='bench.example.com')
+        self.seeder.create_users(count)
+
+    async def run_logins(self, path, total, concurrency, users):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        failures = 0
+
+        async def login(i):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    path,
+                    {'email': self.seeder.email(i % users), 'password': PASSWORD},
+                    content_type='application/json'
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(total)))
+        return time.perf_counter() - start, latencies, failures
+
+    def report(self, label, path, result):
+        elapsed, latencies, failures = result
+        latencies.sort()
+        p95 = percentile(latencies, 0.95)
+        self.stdout.write(
+            f'{label:<6} {path:<24} {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {statistics.median(latencies) * 1000:8.1f} ms  '
+            f'p95 {p95 * 1000:8.1f} ms  falhas {failures}'
+        )
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from auth.benchmarking import percentile, test_database
+from auth.models import Membership, User
+from auth.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede leituras e escritas concorrentes no SQLite para cada perfil de '
+        'banco (DATABASE_PROFILE), cada um em um subprocesso com um banco de '
+        'teste em arquivo: vazão, latência e erros "database is locked".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='default,tuned', help='Perfis comparados, separados por vírgula')
+        parser.add_argument('--writers', type=int, default=4, help='Threads que cadastram membros')
+        parser.add_argument('--readers', type=int, default=4, help='Threads que listam membros')
+        parser.add_argument('--duration', type=float, default=5.0, help='Segundos de carga por perfil')
+        parser.add_argument('--members', type=int, default=2000, help='Membros por organização no banco inicial')
+        parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        results = [self.run_profile(profile.strip(), options) for profile in options['profiles'].split(',')]
+
+        header = (
+            f'{"perfil":<10} {"escritas/s":>10} {"p95 escr.":>10} {"leituras/s":>10} '
+            f'{"p95 leit.":>10} {"locked":>7}'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for result in results:
+            self.stdout.write(
+                f'{result["profile"]:<10} {result["writes_per_second"]:>10.1f} {result["write_p95_ms"]:>8.1f}ms '
+                f'{result["reads_per_second"]:>10.1f} {result["read_p95_ms"]:>8.1f}ms {result["locked_errors"]:>7}'
+            )
+
+    def run_profile(self, profile, options):
+        """Roda o worker em um subprocesso, pois o perfil é lido das settings na inicialização"""
+        command = [
+            sys.executable, '-m', 'django', 'bench_db', '--worker',
+            '--writers', str(options['writers']),
+            '--readers', str(options['readers']),
+            '--duration', str(options['duration']),
+            '--members', str(options['members']),
+        ]
+        env = {**os.environ, 'DATABASE_PROFILE': profile}
+        completed = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise CommandError(f'Perfil {profile} falhou:\n{completed.stderr}')
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['profile'] = profile
+        return result
+
+    def run_worker(self, options):
+        with tempfile.TemporaryDirectory() as directory:
+            # Um banco em arquivo: o SQLite em memória não exercita journal, WAL nem locks.
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            with test_database():
+                seeder = Seeder(seed=1, email_domain='bench.example.com')
+                organization_ids = [organization.pk for organization in seeder.run([(4, options['members'], options['members'])])]
+                connection.close()
+                return self.run_load(organization_ids, seeder.password, options)
+
+    def run_load(self, organization_ids, password, options):
+        deadline = time.monotonic() + options['duration']
+        writes, reads = [], []
+        errors = {'locked': 0}
+
+        def worker(index, operation, latencies):
+            number = 0
+            try:
+                while time.monotonic() < deadline:
+                    organization_id = organization_ids[(index + number) % len(organization_ids)]
+                    start = time.perf_counter()
+                    try:
+                        operation(index, number, organization_id)
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        errors['locked'] += 1
+                    else:
+                        latencies.append(time.perf_counter() - start)
+                    number += 1
+            finally:
+                connection.close()
+
+        def write(index, number, organization_id):
+            email = f'writer{index}-{number}@bench.example.com'
+            with transaction.atomic():
+                user = User.objects.create(email=email, username=email, password=password, org_active_id=organization_id)
+                Membership.objects.create(user=user, organization_id=organization_id)
+
+        def read(index, number, organization_id):
+            list(
+                Membership.objects.filter(organization_id=organization_id)
+                .select_related('user').order_by('id')[:50]
+            )
+
+        threads = [
+            threading.Thread(target=worker, args=(index, write, writes)) for index in range(options['writers'])
+        ] + [
+            threading.Thread(target=worker, args=(index, read, reads)) for index in range(options['readers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        writes.sort()
+        reads.sort()
+        return {
+            'writes_per_second': round(len(writes) / options['duration'], 1),
+            'write_p95_ms': round(percentile(writes, 0.95) * 1000, 2),
+            'reads_per_second': round(len(reads) / options['duration'], 1),
+            'read_p95_ms': round(percentile(reads, 0.95) * 1000, 2),
+            'locked_errors': errors['locked'],
+        }
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from auth.blacklist import revocation_store
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove em lotes os tokens revogados que já expiraram. Com --legacy, '
+        'também limpa as tabelas de blacklist do Simple JWT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--legacy',
+            action='store_true',
+            help='Apaga também OutstandingToken/BlacklistedToken expirados (tabelas antigas)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        deleted = revocation_store.prune(batch_size=batch_size)
+        self.stdout.write(f'{deleted} tokens revogados expirados removidos')
+
+        if options['legacy']:
+            deleted = 0
+            while True:
+                ids = list(
+                    OutstandingToken.objects.filter(expires_at__lte=timezone.now()).order_by()
+                    .values_list('pk', flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+            self.stdout.write(f'{deleted} registros antigos do Simple JWT removidos')
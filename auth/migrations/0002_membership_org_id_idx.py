@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['organization', 'id'], name='membership_org_id_idx'),
+        ),
+    ]
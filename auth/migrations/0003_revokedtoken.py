@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:06
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_blacklisted_tokens(apps, schema_editor):
+    """Traz para a nova tabela os tokens ainda válidos da blacklist do Simple JWT"""
+    BlacklistedToken = apps.get_model('token_blacklist', 'BlacklistedToken')
+    RevokedToken = apps.get_model('custom_auth', 'RevokedToken')
+
+    batch = []
+    rows = BlacklistedToken.objects.filter(
+        token__expires_at__gt=timezone.now()
+    ).values_list('token__jti', 'token__expires_at').iterator(chunk_size=2000)
+
+    for jti, expires_at in rows:
+        batch.append(RevokedToken(jti=jti, expires_at=expires_at))
+        if len(batch) >= 2000:
+            RevokedToken.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    RevokedToken.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0002_membership_org_id_idx'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True, verbose_name='JTI')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='expira em')),
+            ],
+            options={
+                'verbose_name': 'Token revogado',
+                'verbose_name_plural': 'Tokens revogados',
+            },
+        ),
+        migrations.RunPython(copy_blacklisted_tokens, migrations.RunPython.noop),
+    ]
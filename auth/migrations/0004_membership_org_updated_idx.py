@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0003_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['organization', 'updated'], name='membership_org_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0004_membership_org_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='key_uuid',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='user_id_uuid',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.AddField(
+            model_name='membership',
+            name='key_uuid',
+            field=models.UUIDField(null=True),
+        ),
+    ]
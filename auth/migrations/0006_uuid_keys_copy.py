@@ -0,0 +1,58 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:02
+
+import uuid
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+# (modelo, campo texto atual, novo campo UUID)
+KEY_FIELDS = [
+    ('Organization', 'key', 'key_uuid'),
+    ('User', 'user_id', 'user_id_uuid'),
+    ('Membership', 'key', 'key_uuid'),
+]
+
+
+def parse_key(value):
+    try:
+        return uuid.UUID(value)
+    except (TypeError, ValueError):
+        return uuid.uuid4()
+
+
+def copy_keys(apps, schema_editor):
+    """
+    Converte as chaves texto para UUID em lotes por pk, cada lote em sua
+    própria transação, para não prender a tabela inteira em tabelas grandes.
+    Chaves vazias ou inválidas recebem um UUID novo.
+    """
+    for model_name, source, target in KEY_FIELDS:
+        model = apps.get_model('custom_auth', model_name)
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk, **{f'{target}__isnull': True})
+                .order_by('pk')
+                .only('pk', source)[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            for row in rows:
+                setattr(row, target, parse_key(getattr(row, source)))
+            with transaction.atomic():
+                model.objects.bulk_update(rows, [target])
+            last_pk = rows[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('custom_auth', '0005_uuid_keys_add'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:02
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0006_uuid_keys_copy'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='organization',
+            name='key',
+        ),
+        migrations.RenameField(
+            model_name='organization',
+            old_name='key_uuid',
+            new_name='key',
+        ),
+        migrations.AlterField(
+            model_name='organization',
+            name='key',
+            field=models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='Chave da Organização'),
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='user_id',
+        ),
+        migrations.RenameField(
+            model_name='user',
+            old_name='user_id_uuid',
+            new_name='user_id',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='user_id',
+            field=models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='Chave de Usuário'),
+        ),
+        migrations.RemoveField(
+            model_name='membership',
+            name='key',
+        ),
+        migrations.RenameField(
+            model_name='membership',
+            old_name='key_uuid',
+            new_name='key',
+        ),
+        migrations.AlterField(
+            model_name='membership',
+            name='key',
+            field=models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='Chave de Associação'),
+        ),
+    ]
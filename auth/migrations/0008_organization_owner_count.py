@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:19
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_owners(apps, schema_editor):
+    """Preenche o contador com os proprietários ativos atuais em um único UPDATE"""
+    Organization = apps.get_model('custom_auth', 'Organization')
+    Membership = apps.get_model('custom_auth', 'Membership')
+
+    owners = Membership.objects.filter(
+        organization=OuterRef('pk'),
+        role='owner',
+        is_active=True
+    ).order_by().values('organization').annotate(total=Count('pk')).values('total')
+
+    Organization.objects.update(
+        owner_count=Coalesce(Subquery(owners, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0007_uuid_keys_swap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='owner_count',
+            field=models.PositiveIntegerField(default=0, help_text='Mantido por auth.owners; evita contar os proprietários a cada alteração de papel', verbose_name='proprietários ativos'),
+        ),
+        migrations.RunPython(count_owners, migrations.RunPython.noop),
+    ]
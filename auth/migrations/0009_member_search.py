@@ -0,0 +1,88 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:14
+
+import sqlite3
+
+from django.db import migrations, models
+
+
+# Cópia do DDL de auth.search na época desta migração: alterações
+# posteriores no módulo não mudam o que ela cria.
+USER_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS custom_auth_user_fts USING fts5(
+        email, first_name, last_name,
+        content='custom_auth_user', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS custom_auth_user_fts_ai AFTER INSERT ON custom_auth_user BEGIN
+        INSERT INTO custom_auth_user_fts(rowid, email, first_name, last_name)
+        VALUES (new.id, new.email, new.first_name, new.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS custom_auth_user_fts_ad AFTER DELETE ON custom_auth_user BEGIN
+        INSERT INTO custom_auth_user_fts(custom_auth_user_fts, rowid, email, first_name, last_name)
+        VALUES ('delete', old.id, old.email, old.first_name, old.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS custom_auth_user_fts_au
+    AFTER UPDATE OF email, first_name, last_name ON custom_auth_user BEGIN
+        INSERT INTO custom_auth_user_fts(custom_auth_user_fts, rowid, email, first_name, last_name)
+        VALUES ('delete', old.id, old.email, old.first_name, old.last_name);
+        INSERT INTO custom_auth_user_fts(rowid, email, first_name, last_name)
+        VALUES (new.id, new.email, new.first_name, new.last_name);
+    END
+    """,
+    "INSERT INTO custom_auth_user_fts(custom_auth_user_fts) VALUES ('rebuild')",
+]
+
+DROP_USER_SEARCH = [
+    'DROP TRIGGER IF EXISTS custom_auth_user_fts_ai',
+    'DROP TRIGGER IF EXISTS custom_auth_user_fts_ad',
+    'DROP TRIGGER IF EXISTS custom_auth_user_fts_au',
+    'DROP TABLE IF EXISTS custom_auth_user_fts',
+]
+
+
+def fts5_available():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(value)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def create_user_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite' or not fts5_available():
+        return
+    for statement in USER_SEARCH_DDL:
+        schema_editor.execute(statement)
+
+
+def drop_user_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_USER_SEARCH:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0008_organization_owner_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['organization', 'role'], name='membership_org_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['organization', 'is_active'], name='membership_org_active_idx'),
+        ),
+        migrations.RunPython(create_user_search, drop_user_search),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0009_member_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Mantida por auth.tokens; tokens emitidos com uma versão anterior são recusados', verbose_name='versão dos tokens'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0010_user_token_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='membership',
+            name='membership_org_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='member_list_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Mantida por accounts.cache; compõe o ETag e a chave de cache da listagem de membros', verbose_name='versão da listagem de membros'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:59
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_auth', '0011_member_list_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='organization',
+            index=models.Index(django.db.models.functions.comparison.Collate('name', 'nocase'), name='organization_name_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organization',
+            index=models.Index(django.db.models.functions.comparison.Collate('email', 'nocase'), name='organization_email_nocase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organization',
+            index=models.Index(django.db.models.functions.comparison.Collate('organization_id', 'nocase'), name='organization_doc_nocase_idx'),
+        ),
+    ]
@@ -1,46 +1,84 @@
 from django.db import models
+from django.db.models.functions import Collate
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 from hashid_field import HashidAutoField
 import uuid
 
 
-class Organization(models.Model):
+class MaintainedFieldsMixin:
+    """
+    Campos alterados apenas por UPDATE com F(), listados em
+    `maintained_fields`: o save() de uma instância já existente não os grava,
+    para que uma instância carregada antes do incremento não devolva o valor
+    antigo.
+    """
+    maintained_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in self.maintained_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Organization(MaintainedFieldsMixin, models.Model):
     class Meta:
         verbose_name = u"Organização"
         verbose_name_plural = u"Organizações"
+        # Com NOCASE, o `LIKE 'prefixo%'` do istartswith usa o índice no SQLite.
+        indexes = [
+            models.Index(Collate('name', 'nocase'), name='organization_name_nocase_idx'),
+            models.Index(Collate('email', 'nocase'), name='organization_email_nocase_idx'),
+            models.Index(Collate('organization_id', 'nocase'), name='organization_doc_nocase_idx'),
+        ]
 
     is_active = models.BooleanField(verbose_name=u'ativo', default=True,help_text='Conta Ativa',db_index=True)
     name = models.CharField(max_length=50, verbose_name=u'nome da organização')
     email = models.EmailField(verbose_name=u'E-mail', null=True, blank=True)
     organization_id = models.CharField(max_length=50, verbose_name=u'CNPJ/CPF')
-    key = models.CharField(max_length=100, unique=True, verbose_name=u'Chave da Organização', blank=True)
+    key = models.UUIDField(default=uuid.uuid4, unique=True, verbose_name=u'Chave da Organização')
+    owner_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=u'proprietários ativos',
+        help_text='Mantido por auth.owners; evita contar os proprietários a cada alteração de papel'
+    )
+    member_list_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=u'versão da listagem de membros',
+        help_text='Mantida por accounts.cache; compõe o ETag e a chave de cache da listagem de membros'
+    )
+
+    maintained_fields = ('owner_count', 'member_list_version')
 
     def __str__(self):
         return self.name
-    
-    def save(self, *args, **kwargs):
-        if not self.key:
-            self.key = str(uuid.uuid4())
-        super().save(*args, **kwargs)
 
-class User(AbstractUser):
+class User(MaintainedFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True, verbose_name=u'E-mail')
     username = models.CharField(blank=True, null=True,max_length=100, verbose_name=u'Nome de Usuário')
     org_active = models.ForeignKey(Organization, verbose_name=u'organização ativa', blank=True, null=True, on_delete=models.CASCADE, related_name="organization")
     org_list = models.ManyToManyField(Organization, verbose_name=u'organização', blank=True, through='Membership')
     created = models.DateTimeField(auto_now_add=True, auto_now=False, null=True)
-    user_id = models.CharField(max_length=100, unique=True, verbose_name=u'Chave de Usuário', blank=True)
+    user_id = models.UUIDField(default=uuid.uuid4, unique=True, verbose_name=u'Chave de Usuário')
+    token_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=u'versão dos tokens',
+        help_text='Mantida por auth.tokens; tokens emitidos com uma versão anterior são recusados'
+    )
+
+    maintained_fields = ('token_version',)
 
     USERNAME_FIELD = 'email'
     EMAIL_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
-    def save(self, *args, **kwargs):
-        if not self.user_id:
-            self.user_id = str(uuid.uuid4())
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return self.email
 
@@ -61,15 +99,31 @@ class Membership(models.Model):
     is_active = models.BooleanField(verbose_name=u'É um mebro ativo', default=True)
     created = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated = models.DateTimeField(auto_now=True, null=True, blank=True)
-    key = models.CharField(max_length=100, unique=True, verbose_name=u'Chave de Associação', blank=True)
+    key = models.UUIDField(default=uuid.uuid4, unique=True, verbose_name=u'Chave de Associação')
 
     class Meta:
         unique_together = ('user', 'organization')
+        indexes = [
+            models.Index(fields=['organization', 'id'], name='membership_org_id_idx'),
+            models.Index(fields=['organization', 'role'], name='membership_org_role_idx'),
+            models.Index(fields=['organization', 'is_active'], name='membership_org_active_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.email} - {self.organization.name}'
-    
-    def save(self, *args, **kwargs):
-        if not self.key:
-            self.key = str(uuid.uuid4())
-        super().save(*args, **kwargs)
\ No newline at end of file
+
+class RevokedToken(models.Model):
+    """
+    JTI de refresh token revogado, mantido apenas até a expiração do token.
+    Registros expirados são removidos pelo comando `prune_revoked_tokens`.
+    """
+
+    class Meta:
+        verbose_name = u"Token revogado"
+        verbose_name_plural = u"Tokens revogados"
+
+    jti = models.CharField(max_length=255, unique=True, verbose_name=u'JTI')
+    expires_at = models.DateTimeField(db_index=True, verbose_name=u'expira em')
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Membership, Organization
+
+
+class LastOwnerError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Não é possível alterar o role do último proprietário da organização'
+    default_code = 'last_owner'
+
+
+def is_owner(role, is_active):
+    return role == Membership.Roles.OWNER and is_active
+
+
+def add_owners(organization_id, count=1):
+    """Soma `count` ao contador de proprietários ativos da organização"""
+    if count:
+        Organization.objects.filter(pk=organization_id).update(owner_count=F('owner_count') + count)
+
+
+def remove_owner(organization_id, count=1):
+    """
+    Subtrai `count` do contador de proprietários se ainda restar algum.
+
+    O teste e a escrita são um único UPDATE condicional, então duas remoções
+    concorrentes nunca passam juntas pelo último proprietário.
+    """
+    return Organization.objects.filter(
+        pk=organization_id,
+        owner_count__gt=count
+    ).update(owner_count=F('owner_count') - count) == 1
+
+
+def save_membership(membership):
+    """
+    Salva a associação mantendo `Organization.owner_count`.
+
+    O estado anterior é lido do banco com a linha travada, de modo que o
+    contador acompanha a transição real mesmo com escritas concorrentes.
+    Levanta `LastOwnerError` se a alteração deixaria a organização sem
+    proprietário ativo.
+
+    Dentro de uma transação do chamador não abre savepoint: uma falha aqui
+    desfaz a operação inteira.
+    """
+    will_be_owner = is_owner(membership.role, membership.is_active)
+
+    with transaction.atomic(savepoint=False):
+        was_owner = False
+        if membership.pk is not None:
+            current = Membership.objects.select_for_update().filter(
+                pk=membership.pk
+            ).values_list('role', 'is_active').first()
+            was_owner = current is not None and is_owner(*current)
+
+        if was_owner and not will_be_owner:
+            if not remove_owner(membership.organization_id):
+                raise LastOwnerError()
+        elif will_be_owner and not was_owner:
+            add_owners(membership.organization_id)
+
+        membership.save()
+
+    return membership
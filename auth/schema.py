@@ -0,0 +1,7 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class MembershipJWTScheme(SimpleJWTScheme):
+    """Documenta as autenticações JWT do projeto como o esquema Bearer do Simple JWT"""
+    target_class = 'auth.authentication.MembershipJWTAuthentication'
+    match_subclasses = True
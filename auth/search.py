@@ -0,0 +1,157 @@
+import functools
+import re
+import sqlite3
+import uuid
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+USER_SEARCH_TABLE = 'custom_auth_user_fts'
+USER_SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+ORGANIZATION_SEARCH_FIELDS = ('name', 'email', 'organization_id')
+MAX_SEARCH_TERMS = 8
+# Acima disso a busca é ampla e o filtro vai como subconsulta ao índice.
+SEARCH_CANDIDATE_LIMIT = 1000
+
+# Índice externo (content=): o FTS5 guarda apenas os tokens e lê o texto da
+# própria tabela de usuários. Os índices de prefixo de 2 e 3 caracteres
+# deixam as buscas curtas tão baratas quanto as completas.
+USER_SEARCH_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {USER_SEARCH_TABLE} USING fts5(
+        email, first_name, last_name,
+        content='custom_auth_user', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {USER_SEARCH_TABLE}_ai AFTER INSERT ON custom_auth_user BEGIN
+        INSERT INTO {USER_SEARCH_TABLE}(rowid, email, first_name, last_name)
+        VALUES (new.id, new.email, new.first_name, new.last_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {USER_SEARCH_TABLE}_ad AFTER DELETE ON custom_auth_user BEGIN
+        INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}, rowid, email, first_name, last_name)
+        VALUES ('delete', old.id, old.email, old.first_name, old.last_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {USER_SEARCH_TABLE}_au
+    AFTER UPDATE OF email, first_name, last_name ON custom_auth_user BEGIN
+        INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}, rowid, email, first_name, last_name)
+        VALUES ('delete', old.id, old.email, old.first_name, old.last_name);
+        INSERT INTO {USER_SEARCH_TABLE}(rowid, email, first_name, last_name)
+        VALUES (new.id, new.email, new.first_name, new.last_name);
+    END
+    """,
+]
+
+
+@functools.cache
+def fts5_available():
+    """Indica se o SQLite em uso foi compilado com FTS5"""
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(value)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def user_search_enabled(connection):
+    return connection.vendor == 'sqlite' and fts5_available()
+
+
+def install_user_search(connection):
+    """
+    Recria o índice de busca de usuários e os triggers que o mantêm em dia.
+
+    A criação inicial é da migração 0009, que tem a própria cópia do DDL;
+    esta função roda no `post_migrate`, pois o SQLite descarta os triggers
+    quando uma migração recria a tabela de usuários. Idempotente: se algum
+    objeto precisou ser criado, o índice é reconstruído a partir da tabela.
+    """
+    if not user_search_enabled(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name LIKE %s",
+            [f'{USER_SEARCH_TABLE}%']
+        )
+        before = cursor.fetchone()[0]
+        for statement in USER_SEARCH_DDL:
+            cursor.execute(statement)
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name LIKE %s",
+            [f'{USER_SEARCH_TABLE}%']
+        )
+        if cursor.fetchone()[0] != before:
+            cursor.execute(f"INSERT INTO {USER_SEARCH_TABLE}({USER_SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def search_terms(query):
+    """Palavras da busca, sem pontuação: `joao.silva@` vira `joao` e `silva`"""
+    return re.findall(r'\w+', query or '')[:MAX_SEARCH_TERMS]
+
+
+def search_users(queryset, query, field='pk'):
+    """
+    Filtra `queryset` pelos usuários cujo email, nome ou sobrenome começa com
+    cada palavra de `query`. `field` aponta para o usuário no queryset: `pk`
+    para usuários, `user` para associações.
+
+    No SQLite com FTS5 a busca vai ao índice `custom_auth_user_fts`, e os ids
+    encontrados são lidos antes: se forem poucos, entram no filtro como lista
+    e o SQLite busca cada associação pelo índice único (usuário,
+    organização), em vez de percorrer a organização inteira conferindo cada
+    linha. Buscas amplas seguem como subconsulta, que encontra a primeira
+    página logo no começo da organização. Nos demais bancos a busca cai para
+    prefixos (`istartswith`), que não encontram palavras no meio do campo.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    connection = connections[queryset.db]
+    if user_search_enabled(connection):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = f'SELECT rowid FROM {USER_SEARCH_TABLE} WHERE {USER_SEARCH_TABLE} MATCH %s'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{sql} LIMIT %s', [match, SEARCH_CANDIDATE_LIMIT + 1])
+            user_ids = [row[0] for row in cursor.fetchall()]
+        if len(user_ids) > SEARCH_CANDIDATE_LIMIT:
+            user_ids = RawSQL(sql, [match])
+        return queryset.filter(**{f'{field}__in': user_ids})
+
+    prefix = '' if field == 'pk' else f'{field}__'
+    for term in terms:
+        condition = Q()
+        for name in USER_SEARCH_FIELDS:
+            condition |= Q(**{f'{prefix}{name}__istartswith': term})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def search_organizations(queryset, query):
+    """
+    Filtra `queryset` de organizações pela chave, se `query` for um UUID, ou
+    pelo início do nome, do email ou do CNPJ/CPF. Os prefixos usam os
+    índices NOCASE de Organization, e cada condição do OR segue pelo seu.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    try:
+        key = uuid.UUID(query)
+    except ValueError:
+        pass
+    else:
+        return queryset.filter(key=key)
+
+    condition = Q()
+    for name in ORGANIZATION_SEARCH_FIELDS:
+        condition |= Q(**{f'{name}__istartswith': query})
+    return queryset.filter(condition)
@@ -0,0 +1,153 @@
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils.crypto import RANDOM_STRING_CHARS
+
+from .models import Membership, Organization, User
+
+DEFAULT_PASSWORD = 'seed-Passw0rd!'
+# Poucos clientes enormes e uma cauda longa de organizações pequenas.
+DEFAULT_DISTRIBUTION = '2x20000,20x1000-5000,500x5-200'
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João']
+LAST_NAMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Costa', 'Ribeiro', 'Almeida', 'Gomes']
+
+
+def parse_distribution(spec):
+    """
+    Converte "QTDxTAMANHO[-MAX],..." em tuplas (quantidade, mínimo, máximo).
+
+    Ex.: "2x20000,500x5-200" gera duas organizações com 20000 membros e 500
+    com um número de membros sorteado entre 5 e 200.
+    """
+    distribution = []
+    for part in spec.split(','):
+        try:
+            count, size = part.strip().lower().split('x')
+            low, _, high = size.partition('-')
+            low, high = int(low), int(high or low)
+            count = int(count)
+        except ValueError:
+            raise ValueError(f'Faixa inválida: "{part}". Use QTDxTAMANHO ou QTDxMIN-MAX.')
+        if count < 0 or low < 1 or high < low:
+            raise ValueError(f'Faixa inválida: "{part}".')
+        distribution.append((count, low, high))
+    return distribution
+
+
+class Seeder:
+    """
+    Gera organizações, usuários e associações direto com bulk_create.
+
+    Todas as contas compartilham um único hash de senha e as chaves UUID são
+    sorteadas pelo gerador da semente em vez do `uuid4` padrão dos campos.
+    Com a mesma semente, nomes, e-mails, papéis, tamanhos e chaves se repetem.
+    """
+
+    def __init__(self, seed=None, password=DEFAULT_PASSWORD, chunk_size=5000,
+                 email_domain='seed.example.com', manager_ratio=0.05, inactive_ratio=0.0,
+                 progress=None):
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.email_domain = email_domain
+        self.manager_ratio = manager_ratio
+        self.inactive_ratio = inactive_ratio
+        self.progress = progress
+        salt = ''.join(self.random.choice(RANDOM_STRING_CHARS) for _ in range(22))
+        self.password = make_password(password, salt=salt)
+        self.users_created = 0
+        self._pending = []
+
+    def email(self, number):
+        return f'user{number}@{self.email_domain}'
+
+    def uuid(self):
+        return uuid.UUID(int=self.random.getrandbits(128), version=4)
+
+    def run(self, distribution):
+        """Cria as organizações da distribuição e seus membros; retorna as organizações"""
+        sizes = [
+            self.random.randint(low, high)
+            for count, low, high in distribution
+            for _ in range(count)
+        ]
+        organizations = self.create_organizations(len(sizes), with_owner=True)
+
+        for organization, size in zip(organizations, sizes):
+            for index in range(size):
+                self.add_member(organization, index)
+        self.flush()
+
+        return organizations
+
+    def create_organizations(self, count, with_owner=False):
+        offset = Organization.objects.count()
+        organizations = [
+            Organization(
+                name=f'Organização {offset + index}',
+                email=f'org{offset + index}@{self.email_domain}',
+                organization_id=f'{self.random.randrange(10 ** 14):014d}',
+                key=self.uuid(),
+                owner_count=1 if with_owner else 0
+            )
+            for index in range(count)
+        ]
+        return Organization.objects.bulk_create(organizations, batch_size=self.chunk_size)
+
+    def create_users(self, count):
+        """Cria `count` usuários sem organização; útil para testes de login"""
+        for _ in range(count):
+            self._pending.append((self.build_user(None), None, None))
+            if len(self._pending) >= self.chunk_size:
+                self.flush()
+        self.flush()
+
+    def add_member(self, organization, index):
+        if index == 0:
+            role = Membership.Roles.OWNER
+        elif self.random.random() < self.manager_ratio:
+            role = Membership.Roles.MANAGER
+        else:
+            role = Membership.Roles.MEMBER
+
+        self._pending.append((self.build_user(organization), organization, role))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def build_user(self, organization):
+        number = self.users_created + len(self._pending)
+        email = self.email(number)
+        return User(
+            email=email,
+            username=email,
+            password=self.password,
+            first_name=self.random.choice(FIRST_NAMES),
+            last_name=self.random.choice(LAST_NAMES),
+            org_active=organization,
+            user_id=self.uuid()
+        )
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([user for user, _, _ in pending])
+            Membership.objects.bulk_create([
+                Membership(
+                    user=user,
+                    organization=organization,
+                    role=role,
+                    is_active=role == Membership.Roles.OWNER or self.random.random() >= self.inactive_ratio,
+                    key=self.uuid()
+                )
+                for user, (_, organization, role) in zip(users, pending)
+                if organization is not None
+            ])
+
+        self.users_created += len(pending)
+        if self.progress:
+            self.progress(self.users_created)
@@ -1,10 +1,18 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.db import IntegrityError, transaction
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .backends import get_active_membership
+from .hashing import amake_password
 from .models import Organization, Membership
+from .tokens import CompactRefreshToken, add_organization_claims
 
 User = get_user_model()
 
+DUPLICATE_EMAIL_MESSAGE = 'Um usuário com este email já existe.'
+
 class RegisterSerializer(serializers.Serializer):
     full_name = serializers.CharField(max_length=150)
     email = serializers.EmailField()
@@ -19,19 +27,42 @@ class RegisterSerializer(serializers.Serializer):
         first_name = name_parts[0]
         last_name = name_parts[1] if len(name_parts) > 1 else ''
 
-        user = User.objects.create_user(
-            email=email,
-            password=password,
+        # A unicidade do email vem da constraint do banco: um único INSERT,
+        # sem consulta prévia sujeita a corrida entre cadastros simultâneos.
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name,
+                    username=email
+                )
+        except IntegrityError:
+            raise serializers.ValidationError({'email': [DUPLICATE_EMAIL_MESSAGE]})
+
+        return user
+
+    async def acreate(self, validated_data):
+        """Versão assíncrona de `create`: o hash da senha roda fora do event loop"""
+        full_name = validated_data['full_name']
+        email = validated_data['email']
+
+        name_parts = full_name.split(' ', 1)
+        first_name = name_parts[0]
+        last_name = name_parts[1] if len(name_parts) > 1 else ''
+
+        return await User.objects.acreate(
+            email=User.objects.normalize_email(email),
+            password=await amake_password(validated_data['password']),
             first_name=first_name,
             last_name=last_name,
             username=email
         )
 
-        return user
-
 
 class OrganizationSerializer(serializers.ModelSerializer):
-    user_id = serializers.CharField(write_only=True, required=True)
+    user_id = serializers.UUIDField(write_only=True, required=True)
     
     class Meta:
         model = Organization
@@ -45,38 +76,117 @@ class OrganizationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user_id = validated_data.pop('user_id')
         
-        try:
-            user = User.objects.get(user_id=user_id)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("Usuário não encontrado com a chave fornecida.")
-        
-        organization = Organization.objects.create(**validated_data)
-        
-        Membership.objects.create(
-            user=user,
-            organization=organization,
-            role=Membership.Roles.OWNER,
-            is_active=True
-        )
-        
-        user.org_active = organization
-        user.save()
+        with transaction.atomic():
+            try:
+                user = User.objects.only('pk', 'org_active').get(user_id=user_id)
+            except User.DoesNotExist:
+                raise serializers.ValidationError("Usuário não encontrado com a chave fornecida.")
+            
+            # A organização nasce com o proprietário já contado, dispensando o
+            # UPDATE de `save_membership` sobre uma linha que acabou de ser criada.
+            organization = Organization.objects.create(owner_count=1, **validated_data)
+            
+            Membership.objects.create(
+                user=user,
+                organization=organization,
+                role=Membership.Roles.OWNER,
+                is_active=True
+            )
+            
+            user.org_active = organization
+            user.save(update_fields=['org_active'])
         
         return organization
 
 
+class UserOrganizationSerializer(serializers.ModelSerializer):
+    """Organização do usuário com o papel dele e o total de membros ativos"""
+    role = serializers.CharField(read_only=True)
+    status = serializers.BooleanField(source='membership_active', read_only=True)
+    member_count = serializers.IntegerField(read_only=True)
+    is_current = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Organization
+        fields = [
+            'key',
+            'name',
+            'email',
+            'role',
+            'status',
+            'member_count',
+            'is_current'
+        ]
+
+    def get_is_current(self, organization) -> bool:
+        return organization.pk == self.context.get('org_active_id')
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    def validate(self, attrs):
-        data = super().validate(attrs)
-        
-        data['user'] = {
-            'email': self.user.email,
-            'first_name': self.user.first_name,
-            'last_name': self.user.last_name,
+    token_class = CompactRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        return add_organization_claims(token, user, get_active_membership(user))
+
+    @staticmethod
+    def get_user_data(user):
+        return {
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
             'org_active': {
-                'name': self.user.org_active.name if self.user.org_active else None,
-                'organization_key': self.user.org_active.key if self.user.org_active else None
+                'name': user.org_active.name if user.org_active else None,
+                'organization_key': user.org_active.key if user.org_active else None
             }
         }
-        
-        return data
\ No newline at end of file
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data['user'] = self.get_user_data(self.user)
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Renova o token de acesso recarregando as claims da organização, para que
+    mudanças de papel ou de associação apareçam no novo token.
+    """
+    token_class = CompactRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        try:
+            user = User.objects.select_related('org_active').get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except User.DoesNotExist:
+            user = None
+
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        add_organization_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data['refresh'] = str(refresh)
+
+        return data
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from django.db.models import F
+
+from .models import Membership, Organization, User
+from .owners import is_owner
+from .tokens import bump_token_version
+
+
+# Trocar a organização ativa não invalida os tokens das outras sessões: as
+# claims de papel continuam corretas para a organização que cada uma carrega.
+TOKEN_NEUTRAL_USER_FIELDS = {'org_active'}
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and set(update_fields) <= TOKEN_NEUTRAL_USER_FIELDS:
+        return
+    bump_token_version(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_user_delete(sender, instance, **kwargs):
+    bump_token_version(instance.pk)
+
+
+@receiver(post_save, sender=Membership)
+def revoke_tokens_on_membership_change(sender, instance, created, **kwargs):
+    # Uma associação nova não muda as claims dos tokens já emitidos, que não
+    # a conhecem; o próximo token a inclui.
+    if created:
+        return
+    bump_token_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Membership)
+def revoke_tokens_on_membership_delete(sender, instance, **kwargs):
+    bump_token_version(instance.user_id)
+
+
+@receiver(post_delete, sender=Membership)
+def update_owner_count_on_membership_delete(sender, instance, **kwargs):
+    if is_owner(instance.role, instance.is_active):
+        Organization.objects.filter(pk=instance.organization_id).update(owner_count=F('owner_count') - 1)
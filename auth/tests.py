@@ -1,3 +1,471 @@
-from django.test import TestCase
+import io
+import threading
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import StatelessJWTAuthentication
+from .blacklist import REBUILD_INTERVAL, RevocationStore
+from .models import Membership, Organization, User
+from .owners import LastOwnerError
+from .seeding import DEFAULT_PASSWORD, Seeder, parse_distribution
+
+PASSWORD = 'Secr3t!pass'
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthTestCase(TestCase):
+    """Base com uma organização, seu proprietário e um membro, e o cache limpo entre os testes"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.organization = Organization.objects.create(name='Org', organization_id='1', owner_count=1)
+        self.owner = self.create_member('owner@example.com', Membership.Roles.OWNER)
+        self.member = self.create_member('member@example.com')
+
+    def create_member(self, email, role=Membership.Roles.MEMBER):
+        user = User.objects.create_user(
+            username=email.split('@')[0], email=email, password=PASSWORD, org_active=self.organization
+        )
+        Membership.objects.create(user=user, organization=self.organization, role=role)
+        return user
+
+    def login(self, email, client=None):
+        response = (client or self.client).post(
+            '/api/v1/token/', {'email': email, 'password': PASSWORD}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response.json()
+
+    def authenticate(self, email, client=None):
+        tokens = self.login(email, client)
+        (client or self.client).credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        return tokens
+
+
+@override_settings(PASSWORD_HASHING_QUEUE_TIMEOUT=0)
+class PasswordHashAdmissionTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('auth.hashing._hashing_slots', threading.BoundedSemaphore(1))
+        self.slots = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_slot_is_released_when_the_view_raises(self):
+        payload = {'full_name': 'Ana Souza', 'email': 'ana@example.com', 'password': PASSWORD}
+        with mock.patch('auth.views.RegisterSerializer.save', side_effect=OperationalError):
+            for _ in range(2):
+                with self.assertRaises(OperationalError):
+                    self.client.post('/api/v1/register/', payload, format='json')
+
+        self.login(self.owner.email)
+
+    def test_busy_slot_answers_429(self):
+        self.slots.acquire()
+        self.addCleanup(self.slots.release)
+
+        response = self.client.post(
+            '/api/v1/token/', {'email': self.owner.email, 'password': PASSWORD}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+
+class TokenQueryTests(AuthTestCase):
+
+    def test_login_runs_a_single_select(self):
+        with self.assertNumQueries(1):
+            tokens = self.login(self.owner.email)
+
+        self.assertEqual(AccessToken(tokens['access'])['role'], Membership.Roles.OWNER)
+
+    def test_activate_organization_reuses_the_loaded_user(self):
+        other = Organization.objects.create(name='Outra', organization_id='2', owner_count=1)
+        Membership.objects.create(user=self.owner, organization=other, role=Membership.Roles.OWNER)
+        self.authenticate(self.owner.email)
+
+        # Autenticação, associação com a organização escolhida e o UPDATE.
+        with self.assertNumQueries(3):
+            response = self.client.post(f'/api/v1/organizations/{other.key}/activate/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(
+            AccessToken(response.json()['access'])['ver'],
+            User.objects.get(pk=self.owner.pk).token_version
+        )
+
+
+class CreationTests(AuthTestCase):
+    """Cadastro e criação de organização em uma transação, com o número de comandos fixo"""
+
+    def register(self, email):
+        return self.client.post(
+            '/api/v1/register/', {'full_name': 'Ana Souza', 'email': email, 'password': PASSWORD}, format='json'
+        )
+
+    def create_organization(self, user_id):
+        return self.client.post('/api/v1/create-organization/', {
+            'name': 'Nova',
+            'organization_id': '3',
+            'user_id': str(user_id),
+        }, format='json')
+
+    def test_register_runs_a_single_insert(self):
+        # Savepoint, INSERT e liberação do savepoint.
+        with self.assertNumQueries(3):
+            response = self.register('ana@example.com')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+
+    def test_register_with_a_taken_email_answers_400(self):
+        response = self.register(self.member.email)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+        self.assertEqual(User.objects.filter(email=self.member.email).count(), 1)
+
+    def test_create_organization_statements(self):
+        # Usuário, organização, associação, versão da listagem e org_active,
+        # entre o savepoint e sua liberação.
+        with self.assertNumQueries(7):
+            response = self.create_organization(self.member.user_id)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.member.refresh_from_db(fields=['org_active'])
+        self.assertEqual(self.member.org_active.name, 'Nova')
+
+    def test_unknown_user_creates_no_organization(self):
+        response = self.create_organization(uuid.uuid4())
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Organization.objects.filter(name='Nova').exists())
+
+    def test_failure_after_the_insert_leaves_no_organization(self):
+        with mock.patch.object(User, 'save', side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                self.create_organization(self.member.user_id)
+
+        self.assertFalse(Organization.objects.filter(name='Nova').exists())
+        self.assertFalse(Membership.objects.filter(user=self.member).exclude(organization=self.organization).exists())
+
+
+class AsyncAuthViewTests(AuthTestCase):
+
+    async def post(self, path, data):
+        return await self.async_client.post(path, data, content_type='application/json')
+
+    async def test_register(self):
+        payload = {'full_name': 'Ana Souza', 'email': 'ana@example.com', 'password': PASSWORD}
+
+        response = await self.post('/api/v1/async/register/', payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        user = await User.objects.aget(email='ana@example.com')
+        self.assertEqual((user.first_name, user.last_name), ('Ana', 'Souza'))
+        self.assertEqual(response.json()['user_id'], str(user.user_id))
+
+    async def test_register_with_a_taken_email_answers_400(self):
+        payload = {'full_name': 'Outra Pessoa', 'email': self.member.email, 'password': PASSWORD}
+
+        response = await self.post('/api/v1/async/register/', payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.json())
+
+    async def test_body_must_be_an_object(self):
+        for body in (['email'], 'texto'):
+            response = await self.post('/api/v1/async/token/', body)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('detail', response.json())
+
+        response = await self.async_client.post('/api/v1/async/token/', b'{', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_token(self):
+        response = await self.post('/api/v1/async/token/', {'email': self.owner.email, 'password': PASSWORD})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        body = response.json()
+        self.assertEqual(AccessToken(body['access'])['role'], Membership.Roles.OWNER)
+        self.assertEqual(body['user']['org_active']['name'], self.organization.name)
+
+    async def test_token_with_a_wrong_password_or_email_answers_401(self):
+        for email, password in ((self.owner.email, 'errada'), ('ninguem@example.com', PASSWORD)):
+            response = await self.post('/api/v1/async/token/', {'email': email, 'password': password})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_token_requires_both_fields(self):
+        response = await self.post('/api/v1/async/token/', {})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {'email', 'password'})
+
+
+class SeederTests(AuthTestCase):
+
+    def test_rows_and_batches(self):
+        organizations = Organization.objects.count()
+        seeder = Seeder(seed=1, chunk_size=10, manager_ratio=0)
+
+        with CaptureQueriesContext(connection) as queries:
+            created = seeder.run(parse_distribution('2x12,3x1-4'))
+
+        sizes = [organization.membership_set.count() for organization in created]
+        self.assertEqual(len(created), 5)
+        self.assertEqual(sizes[:2], [12, 12])
+        self.assertTrue(all(1 <= size <= 4 for size in sizes[2:]))
+        self.assertEqual(seeder.users_created, sum(sizes))
+        self.assertEqual(Organization.objects.count(), organizations + 5)
+        for organization in created:
+            self.assertEqual(organization.owner_count, 1)
+            self.assertEqual(organization.membership_set.filter(role=Membership.Roles.OWNER).count(), 1)
+
+        user_inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "custom_auth_user"')
+        ]
+        self.assertEqual(len(user_inserts), -(-sum(sizes) // 10))
+
+    def test_seeded_accounts_can_log_in(self):
+        out = io.StringIO()
+        call_command('seed', distribution='1x3', seed=1, chunk_size=2, stdout=out)
+
+        self.assertIn('1 organizações e 3 usuários', out.getvalue())
+        response = self.client.post(
+            '/api/v1/token/', {'email': 'user0@seed.example.com', 'password': DEFAULT_PASSWORD}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        self.assertEqual(AccessToken(response.json()['access'])['role'], Membership.Roles.OWNER)
+
+    def test_invalid_distribution(self):
+        for spec in ('2x', 'x10', '1x5-2', '1x0'):
+            with self.assertRaises(ValueError):
+                parse_distribution(spec)
+
+
+class StatelessRevocationTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(APIView, 'authentication_classes', [StatelessJWTAuthentication])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def demote(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/v1/accounts/members/bulk-update/',
+                {'ids': [user.pk], 'role': Membership.Roles.MEMBER},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+
+    def test_demoted_token_stays_revoked_after_cache_loss(self):
+        manager = self.create_member('manager@example.com', Membership.Roles.MANAGER)
+        manager_client = APIClient()
+        self.authenticate(manager.email, manager_client)
+        self.authenticate(self.owner.email)
+
+        self.demote(manager)
+        cache.clear()
+
+        response = manager_client.post(
+            '/api/v1/accounts/members/bulk-update/',
+            {'ids': [manager.pk], 'role': Membership.Roles.MANAGER},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Membership.objects.get(user=manager).role, Membership.Roles.MEMBER)
+
+    def test_new_token_is_accepted_after_revocation(self):
+        self.authenticate(self.owner.email)
+        old_client = APIClient()
+        self.authenticate(self.member.email, old_client)
+        self.demote(self.member)
+        self.assertEqual(old_client.get('/api/v1/accounts/members/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        member_client = APIClient()
+        self.authenticate(self.member.email, member_client)
+        response = member_client.get('/api/v1/accounts/members/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_saving_a_stale_instance_keeps_the_token_version(self):
+        self.authenticate(self.owner.email)
+        stale = User.objects.get(pk=self.member.pk)
+        self.demote(self.member)
+        version = User.objects.get(pk=self.member.pk).token_version
+
+        stale.first_name = 'Novo'
+        stale.save()
+
+        self.assertEqual(User.objects.get(pk=self.member.pk).token_version, version + 1)
+
+    def test_new_membership_keeps_the_issued_tokens(self):
+        member_client = APIClient()
+        self.authenticate(self.member.email, member_client)
+        other = Organization.objects.create(name='Outra', organization_id='2', owner_count=1)
+        version = User.objects.get(pk=self.member.pk).token_version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Membership.objects.create(user=self.member, organization=other)
+
+        self.assertEqual(User.objects.get(pk=self.member.pk).token_version, version)
+        self.assertEqual(member_client.get('/api/v1/accounts/members/').status_code, status.HTTP_200_OK)
+
+    def test_deleted_user_token_is_rejected(self):
+        member_client = APIClient()
+        self.authenticate(self.member.email, member_client)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.delete()
+
+        response = member_client.get('/api/v1/accounts/members/')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class RefreshRotationTests(AuthTestCase):
+
+    def refresh(self, token):
+        return self.client.post('/api/v1/token/refresh/', {'refresh': token}, format='json')
+
+    def test_rotated_refresh_token_cannot_be_replayed(self):
+        tokens = self.login(self.member.email)
+
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.json()['refresh'], tokens['refresh'])
+
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, status.HTTP_200_OK)
+
+    def test_revocation_is_visible_to_another_process(self):
+        jti = uuid.uuid4().hex
+        RevocationStore().revoke(jti, timezone.now() + timedelta(days=1))
+
+        self.assertTrue(RevocationStore().is_revoked(jti))
+
+    @mock.patch('auth.blacklist.cache_is_shared', return_value=True)
+    def test_stale_filter_is_rebuilt_before_checking(self, shared):
+        store = RevocationStore()
+        self.assertFalse(store.is_revoked(uuid.uuid4().hex))
+
+        jti = uuid.uuid4().hex
+        RevocationStore().revoke(jti, timezone.now() + timedelta(days=1))
+        cache.clear()
+        store._built_at -= REBUILD_INTERVAL
+
+        self.assertTrue(store.is_revoked(jti))
+
+    @mock.patch('auth.blacklist.cache_is_shared', return_value=True)
+    def test_recent_revocation_is_found_in_the_shared_cache(self, shared):
+        store = RevocationStore()
+        self.assertFalse(store.is_revoked(uuid.uuid4().hex))
+
+        jti = uuid.uuid4().hex
+        RevocationStore().revoke(jti, timezone.now() + timedelta(days=1))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(store.is_revoked(jti))
+
+
+class AdminSearchTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = Organization.objects.create(name='Outra Empresa', organization_id='2')
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password=PASSWORD)
+        self.client.force_login(admin)
+
+    def changelist(self, model, query):
+        response = self.client.get(f'/admin/custom_auth/{model}/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return list(response.context['cl'].result_list)
+
+    def test_memberships_by_organization_name_prefix(self):
+        Membership.objects.create(user=self.member, organization=self.other)
+
+        results = self.changelist('membership', 'outra')
+
+        self.assertEqual([(m.user, m.organization) for m in results], [(self.member, self.other)])
+
+    def test_memberships_by_user_or_organization(self):
+        results = self.changelist('membership', 'member')
+
+        self.assertEqual([m.user for m in results], [self.member])
+
+    def test_memberships_by_organization_key(self):
+        results = self.changelist('membership', str(self.organization.key))
+
+        self.assertEqual({m.user for m in results}, {self.owner, self.member})
+
+    def test_organizations_by_prefix_of_each_field(self):
+        self.assertEqual(self.changelist('organization', 'OUT'), [self.other])
+        self.assertEqual(self.changelist('organization', '2'), [self.other])
+        self.assertEqual(self.changelist('organization', 'empresa'), [])
+
+    def test_page_keeps_the_changelist_order(self):
+        results = self.changelist('membership', '')
+
+        self.assertEqual([m.pk for m in results], sorted((m.pk for m in results), reverse=True))
+
+
+class MembershipAdminFormTests(AuthTestCase):
+
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password=PASSWORD)
+        self.client.force_login(admin)
+
+    def change(self, user, role, is_active=True):
+        membership = Membership.objects.get(user=user, organization=self.organization)
+        data = {'role': role, 'key': membership.key}
+        if is_active:
+            data['is_active'] = 'on'
+        return self.client.post(f'/admin/custom_auth/membership/{membership.pk}/change/', data)
+
+    def owner_count(self):
+        self.organization.refresh_from_db(fields=['owner_count'])
+        return self.organization.owner_count
+
+    def test_last_owner_cannot_be_demoted(self):
+        response = self.change(self.owner, Membership.Roles.MEMBER)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, LastOwnerError.default_detail)
+        self.assertEqual(Membership.objects.get(user=self.owner).role, Membership.Roles.OWNER)
+        self.assertEqual(self.owner_count(), 1)
+
+    def test_promote_and_deactivate_owner(self):
+        self.assertEqual(self.change(self.member, Membership.Roles.OWNER).status_code, status.HTTP_302_FOUND)
+        self.assertEqual(self.owner_count(), 2)
+
+        self.assertEqual(
+            self.change(self.member, Membership.Roles.OWNER, is_active=False).status_code,
+            status.HTTP_302_FOUND
+        )
+        self.assertEqual(self.owner_count(), 1)
+
+    def test_saving_the_organization_keeps_the_counter(self):
+        stale = Organization.objects.get(pk=self.organization.pk)
+        self.change(self.member, Membership.Roles.OWNER)
+
+        stale.name = 'Renomeada'
+        stale.save()
+
+        self.assertEqual(self.owner_count(), 2)
@@ -0,0 +1,80 @@
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import SimpleRateThrottle
+
+from .hashing import acquire_hashing_slot, release_hashing_slot
+
+# Sugestão de espera enviada no Retry-After quando falta capacidade de hash.
+HASHING_RETRY_AFTER = 1
+
+
+class PasswordHashIPThrottle(SimpleRateThrottle):
+    """Janela deslizante, por IP, para endpoints que calculam hash de senha"""
+    scope = 'password_hash_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+class PasswordHashEmailThrottle(SimpleRateThrottle):
+    """Janela deslizante, por email informado, para endpoints que calculam hash de senha"""
+    scope = 'password_hash_email'
+
+    def get_cache_key(self, request, view):
+        data = getattr(request, 'data', None)
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': email.strip().lower()
+        }
+
+
+class HashingCapacityExceeded(Throttled):
+    default_detail = 'Servidor ocupado processando senhas. Tente novamente em instantes.'
+
+
+class PasswordHashAdmissionMixin:
+    """
+    Controle de admissão para views DRF que calculam hash de senha.
+
+    Aplica os limites por IP e por email e reserva uma das vagas de hash do
+    processo durante a requisição. Sem vaga ou acima do limite, responde 429
+    com Retry-After, preservando os workers para o restante da API.
+    `password_hash_actions` restringe o controle a algumas ações de um
+    ViewSet; None aplica a todas.
+    """
+    password_hash_throttle_classes = [PasswordHashIPThrottle, PasswordHashEmailThrottle]
+    password_hash_actions = None
+
+    def requires_password_hash_admission(self):
+        if self.password_hash_actions is None:
+            return True
+        return getattr(self, 'action', None) in self.password_hash_actions
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+        if self.requires_password_hash_admission():
+            throttles += [throttle() for throttle in self.password_hash_throttle_classes]
+        return throttles
+
+    def dispatch(self, request, *args, **kwargs):
+        # O DRF relança exceções que não são APIException antes de
+        # finalize_response, então a vaga é devolvida aqui, em qualquer saída.
+        self._holds_hashing_slot = False
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._holds_hashing_slot:
+                self._holds_hashing_slot = False
+                release_hashing_slot()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.requires_password_hash_admission():
+            if not acquire_hashing_slot():
+                raise HashingCapacityExceeded(wait=HASHING_RETRY_AFTER)
+            self._holds_hashing_slot = True
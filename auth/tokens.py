@@ -0,0 +1,130 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken, Token
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import revocation_store
+from .models import Membership, User
+
+TOKEN_VERSION_KEY = 'auth:token-version:{}'
+# A versão fica no banco (User.token_version); o cache é só uma leitura
+# antecipada, apagada a cada incremento e com validade curta para limitar o
+# efeito de uma leitura concorrente que grave um valor antigo.
+TOKEN_VERSION_CACHE_TIMEOUT = 300
+
+
+def get_token_version(user_id):
+    """
+    Retorna a versão atual dos tokens do usuário, lendo do banco quando não
+    está em cache. Usuários removidos não têm versão (None), e nenhum token
+    confere com ela.
+    """
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            cache.add(key, version, timeout=TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_token_version(user_id):
+    """Versão assíncrona de `get_token_version`"""
+    key = TOKEN_VERSION_KEY.format(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = await User.objects.filter(pk=user_id).values_list('token_version', flat=True).afirst()
+        if version is not None:
+            await cache.aadd(key, version, timeout=TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def bump_token_version(user_id):
+    """
+    Invalida os tokens já emitidos para o usuário.
+
+    Tokens carregam a versão vigente no momento da emissão; incrementá-la faz
+    com que a autenticação sem estado rejeite os antigos. A cópia em cache é
+    apagada quando a transação é confirmada.
+    """
+    bump_token_versions([user_id])
+
+
+def bump_token_versions(user_ids):
+    """Versão em lote de `bump_token_version`: um UPDATE para qualquer número de usuários"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    User.objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    keys = [TOKEN_VERSION_KEY.format(user_id) for user_id in user_ids]
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def add_organization_claims(token, user, membership=None):
+    """
+    Inclui no token a organização ativa, o papel e o status da associação do
+    usuário, além da versão usada para revogação.
+    """
+    organization = user.org_active
+
+    if organization is not None and membership is None:
+        membership = Membership.objects.filter(
+            user_id=user.pk,
+            organization_id=organization.pk
+        ).only('role', 'is_active').first()
+
+    token['org_active'] = {
+        'id': organization.pk,
+        'key': str(organization.key),
+        'name': organization.name,
+    } if organization is not None else None
+    token['role'] = membership.role if membership is not None else None
+    token['membership_active'] = membership.is_active if membership is not None else False
+    token['ver'] = loaded_token_version(user)
+    return token
+
+
+def loaded_token_version(user):
+    """
+    Versão dos tokens do usuário, aproveitando a que veio no SELECT que o
+    carregou. Usuários montados a partir das claims, ou instâncias não
+    persistidas, recorrem a `get_token_version`.
+    """
+    if isinstance(user, User) and not user._state.adding:
+        return user.token_version
+    return get_token_version(user.pk)
+
+
+class CompactRefreshToken(RefreshToken):
+    """
+    Refresh token que usa a blacklist compacta (`RevokedToken`).
+
+    Não grava OutstandingToken ao emitir nem ao rotacionar: só os tokens
+    revogados são persistidos, e apenas até expirarem.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        return super(BlacklistMixin, cls).for_user(user)
+
+    def verify(self, *args, **kwargs):
+        self.check_blacklist()
+        Token.verify(self, *args, **kwargs)
+
+    def check_blacklist(self):
+        if revocation_store.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError('Token está na blacklist')
+
+    def blacklist(self):
+        revocation_store.revoke(
+            self.payload[api_settings.JTI_CLAIM],
+            datetime_from_epoch(self.payload['exp'])
+        )
+
+    def outstand(self):
+        return None
@@ -1,7 +1,16 @@
 from django.urls import path
-from .views import RegisterView, CreateOrganizationView
+from .views import (
+    ActivateOrganizationView,
+    AsyncRegisterView,
+    CreateOrganizationView,
+    RegisterView,
+    UserOrganizationListView,
+)
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('create-organization/', CreateOrganizationView.as_view(), name='create_organization'),
-]
\ No newline at end of file
+    path('async/register/', AsyncRegisterView.as_view(), name='register_async'),
+    path('organizations/', UserOrganizationListView.as_view(), name='user_organizations'),
+    path('organizations/<uuid:key>/activate/', ActivateOrganizationView.as_view(), name='activate_organization'),
+]
@@ -1,18 +1,42 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.http import JsonResponse
 from django.shortcuts import render
-from rest_framework import status
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import authenticate
-from .serializers import RegisterSerializer, OrganizationSerializer, CustomTokenObtainPairSerializer
+from .backends import with_active_membership
+from .hashing import acheck_password, acquire_hashing_slot, amake_password, release_hashing_slot
+from .models import Membership, Organization
+from .serializers import (
+    DUPLICATE_EMAIL_MESSAGE,
+    CustomTokenObtainPairSerializer,
+    OrganizationSerializer,
+    RegisterSerializer,
+    UserOrganizationSerializer,
+)
+from .tokens import CompactRefreshToken, add_organization_claims
+from .throttling import HASHING_RETRY_AFTER, HashingCapacityExceeded, PasswordHashAdmissionMixin
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
+User = get_user_model()
+
 
-class RegisterView(APIView):
+class RegisterView(PasswordHashAdmissionMixin, APIView):
     """
         Cadastre um novo usuário.
     """
@@ -53,7 +77,7 @@ class RegisterView(APIView):
                     'user_id': {
                         'type': 'string',
                         'description': 'Chave única do usuário para criação de organização',
-                        'example': 'ABC123DEF456'
+                        'example': '3f2b8c1e-9a4d-4e6f-b7a2-5c8d1e0f4a9b'
                     }
                 }
             },
@@ -108,7 +132,7 @@ class CreateOrganizationView(APIView):
                     'name': 'Minha Empresa Ltda',
                     'email': 'contato@minhaempresa.com',
                     'organization_id': '12.345.678/0001-90',
-                    'user_id': 'ABC123DEF456'
+                    'user_id': '3f2b8c1e-9a4d-4e6f-b7a2-5c8d1e0f4a9b'
                 }
             )
         ]
@@ -127,7 +151,97 @@ class CreateOrganizationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CustomTokenObtainPairView(TokenObtainPairView):
+class UserOrganizationListView(generics.ListAPIView):
+    """
+        Liste as organizações do usuário, com o papel dele e o total de membros ativos.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = UserOrganizationSerializer
+
+    def get_queryset(self):
+        """
+        Uma única consulta: o papel e o status vêm do JOIN com a associação do
+        usuário e o total de membros de uma subconsulta correlacionada.
+        """
+        member_count = Membership.objects.filter(
+            organization=OuterRef('pk'),
+            is_active=True
+        ).order_by().values('organization').annotate(total=Count('pk')).values('total')
+
+        return Organization.objects.filter(
+            membership__user_id=self.request.user.pk
+        ).annotate(
+            role=F('membership__role'),
+            membership_active=F('membership__is_active'),
+            member_count=Coalesce(Subquery(member_count, output_field=IntegerField()), 0)
+        ).order_by('name', 'pk')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['org_active_id'] = self.request.user.org_active_id
+        return context
+
+
+class ActivateOrganizationView(APIView):
+    """
+        Troque a organização ativa do usuário e receba novos tokens com a organização escolhida.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'refresh': {'type': 'string'},
+                    'access': {'type': 'string'},
+                    'org_active': {
+                        'type': 'object',
+                        'properties': {
+                            'key': {'type': 'string', 'format': 'uuid'},
+                            'name': {'type': 'string'},
+                            'role': {'type': 'string'}
+                        }
+                    }
+                }
+            },
+            404: OpenApiTypes.OBJECT
+        }
+    )
+    def post(self, request, key):
+        membership = Membership.objects.select_related('organization').filter(
+            user_id=request.user.pk,
+            organization__key=key,
+            is_active=True
+        ).first()
+        if membership is None:
+            return Response(
+                {'detail': 'Organização não encontrada entre as associações ativas do usuário'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Com autenticação sem estado, request.user vem do token; basta a pk
+        # para gravar apenas org_active_id.
+        user = request.user if isinstance(request.user, User) else User(pk=request.user.pk)
+        user.org_active = membership.organization
+        user.save(update_fields=['org_active'])
+
+        refresh = CompactRefreshToken.for_user(user)
+        add_organization_claims(refresh, user, membership)
+
+        return Response({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'org_active': {
+                'key': membership.organization.key,
+                'name': membership.organization.name,
+                'role': membership.role
+            }
+        })
+
+
+class CustomTokenObtainPairView(PasswordHashAdmissionMixin, TokenObtainPairView):
     """
         Obtenha o par de tokens JWT.
     """
@@ -218,8 +332,125 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         ]
     )
     def post(self, request, *args, **kwargs):
-        data = request.data.copy()
-        if 'email' in data and 'username' not in data:
-            data['username'] = data['email']
-        request._full_data = data
-        return super().post(request, *args, **kwargs)
\ No newline at end of file
+        return super().post(request, *args, **kwargs)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncJSONView(View):
+    """
+        Base para views assíncronas nativas que recebem e retornam JSON.
+
+        Subclasses implementam `handle(request, data)`. As que calculam hash
+        de senha passam pelo mesmo controle de admissão das views DRF.
+    """
+    http_method_names = ['post', 'options']
+    password_hash_admission = True
+
+    async def post(self, request):
+        data = self.parse_body(request)
+        if data is None:
+            return self.invalid_body()
+
+        if not self.password_hash_admission:
+            return await self.handle(request, data)
+
+        rejection = await self.admit(request, data)
+        if rejection is not None:
+            return rejection
+        try:
+            return await self.handle(request, data)
+        finally:
+            release_hashing_slot()
+
+    async def handle(self, request, data):
+        raise NotImplementedError
+
+    async def admit(self, request, data):
+        """Aplica os limites por IP/email e reserva uma vaga de hash sem bloquear o event loop"""
+        request.data = data
+        for throttle_class in PasswordHashAdmissionMixin.password_hash_throttle_classes:
+            throttle = throttle_class()
+            if not await sync_to_async(throttle.allow_request)(request, self):
+                return self.throttled(throttle.wait())
+
+        if not acquire_hashing_slot(blocking=False):
+            return self.throttled(HASHING_RETRY_AFTER, HashingCapacityExceeded.default_detail)
+        return None
+
+    def throttled(self, wait, detail='Muitas requisições. Tente novamente mais tarde.'):
+        response = JsonResponse({'detail': detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if wait is not None:
+            response['Retry-After'] = str(max(1, round(wait)))
+        return response
+
+    def parse_body(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def invalid_body(self):
+        return JsonResponse({'detail': 'Corpo da requisição deve ser um objeto JSON.'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncRegisterView(AsyncJSONView):
+    """
+        Cadastre um novo usuário (versão assíncrona, para ASGI).
+    """
+    async def handle(self, request, data):
+        serializer = RegisterSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            user = await serializer.acreate(serializer.validated_data)
+        except IntegrityError:
+            return JsonResponse(
+                {'email': [DUPLICATE_EMAIL_MESSAGE]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return JsonResponse(
+            {
+                "message": "Usuário registrado com sucesso",
+                "user_id": str(user.user_id)
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+class AsyncTokenObtainPairView(AsyncJSONView):
+    """
+        Obtenha o par de tokens JWT (versão assíncrona, para ASGI).
+    """
+    no_active_account = 'Nenhuma conta ativa encontrada com as credenciais fornecidas'
+
+    async def handle(self, request, data):
+        email = data.get('email') or data.get('username')
+        password = data.get('password')
+        errors = {}
+        if not email:
+            errors['email'] = ['Este campo é obrigatório.']
+        if not password:
+            errors['password'] = ['Este campo é obrigatório.']
+        if errors:
+            return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user = await with_active_membership(User.objects.filter(email=email)).afirst()
+
+        if user is None:
+            # Gera um hash mesmo sem usuário para não revelar pelo tempo de
+            # resposta se o email está cadastrado.
+            await amake_password(password)
+            return JsonResponse({'detail': self.no_active_account}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if not await acheck_password(password, user.password) or not user.is_active:
+            return JsonResponse({'detail': self.no_active_account}, status=status.HTTP_401_UNAUTHORIZED)
+
+        refresh = await sync_to_async(CustomTokenObtainPairSerializer.get_token)(user)
+        return JsonResponse({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user': CustomTokenObtainPairSerializer.get_user_data(user)
+        })
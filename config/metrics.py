@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Métricas da requisição amostrada em andamento. O ContextVar acompanha a
+# requisição através de sync_to_async, então consultas feitas na thread do
+# ORM também são contadas.
+current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Contadores de uma requisição: consultas SQL, tempo de banco e trechos nomeados"""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.queries = {}
+        self.timings = {}
+
+    def record_query(self, sql, duration):
+        self.query_count += 1
+        self.db_time += duration
+        self.queries[sql] = self.queries.get(sql, 0) + 1
+
+    def add_timing(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def duplicates(self):
+        """Consultas idênticas executadas mais de uma vez, das mais repetidas para as menos"""
+        return sorted(
+            ((sql, count) for sql, count in self.queries.items() if count > 1),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper instalado em cada conexão; só mede se a requisição foi amostrada"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - start)
+
+
+@contextmanager
+def timing(name):
+    """Acumula o tempo do bloco na métrica `name` da requisição atual, se houver"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_timing(name, time.perf_counter() - start)
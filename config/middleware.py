@@ -0,0 +1,294 @@
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import RequestMetrics, current_metrics, record_queries
+from .profiling import PROFILERS
+
+logger = logging.getLogger('config.request_metrics')
+profiler_logger = logging.getLogger('config.request_profiler')
+
+REQUEST_METRICS_DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,
+    'SLOW_REQUEST_MS': 500,
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+    'SERVER_TIMING': True,
+}
+
+REQUEST_PROFILER_DEFAULTS = {
+    'TOKEN': '',
+    'SAMPLE_RATE': 0.0,
+    'MODE': 'cprofile',
+    'SAMPLE_INTERVAL_MS': 5,
+    'DIRECTORY': os.path.join(tempfile.gettempdir(), 'request-profiles'),
+    # Retenção por endpoint: os arquivos mais antigos saem primeiro.
+    'MAX_FILES_PER_ENDPOINT': 50,
+    'MAX_AGE_HOURS': 72,
+}
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+class RequestMetricsMiddleware:
+    """
+    Mede cada requisição: tempo total, número de consultas, tempo de banco,
+    consultas duplicadas (sinal de N+1) e trechos marcados com
+    `config.metrics.timing`.
+
+    Apenas uma fração das requisições (`SAMPLE_RATE`) é instrumentada; nas
+    demais o custo é uma leitura de ContextVar por consulta. Requisições
+    amostradas recebem o cabeçalho `Server-Timing`. Requisições acima de
+    `SLOW_REQUEST_MS`, ou com ao menos `DUPLICATE_QUERY_THRESHOLD` consultas
+    repetidas, geram uma linha de log em JSON.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = {**REQUEST_METRICS_DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        self.slow_request = config['SLOW_REQUEST_MS'] / 1000
+        self.duplicate_threshold = config['DUPLICATE_QUERY_THRESHOLD']
+        self.server_timing = config['SERVER_TIMING']
+
+        connection_created.connect(install_query_recorder, dispatch_uid='request_metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection=connection)
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                current_metrics.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                current_metrics.reset(token)
+        self.finish(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    def start(self):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None, None
+        metrics = RequestMetrics()
+        return metrics, current_metrics.set(metrics)
+
+    def finish(self, request, response, metrics, elapsed):
+        duplicates = metrics.duplicates() if metrics is not None else []
+        repeated = sum(count - 1 for _, count in duplicates)
+
+        if metrics is not None and self.server_timing:
+            response['Server-Timing'] = self.server_timing_header(metrics, repeated, elapsed)
+
+        slow = elapsed >= self.slow_request
+        if slow or repeated >= self.duplicate_threshold:
+            logger.warning(json.dumps(self.log_record(request, response, metrics, duplicates, repeated, elapsed, slow)))
+
+    def server_timing_header(self, metrics, repeated, elapsed):
+        entries = [
+            f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.query_count} queries"',
+            f'dup;desc="{repeated} duplicated queries"',
+        ]
+        entries.extend(f'{name};dur={duration * 1000:.2f}' for name, duration in metrics.timings.items())
+        entries.append(f'total;dur={elapsed * 1000:.2f}')
+        return ', '.join(entries)
+
+    def log_record(self, request, response, metrics, duplicates, repeated, elapsed, slow):
+        record = {
+            'event': 'slow_request' if slow else 'duplicate_queries',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(elapsed * 1000, 2),
+            'sampled': metrics is not None,
+        }
+        if metrics is not None:
+            record.update({
+                'queries': metrics.query_count,
+                'db_ms': round(metrics.db_time * 1000, 2),
+                'duplicated_queries': repeated,
+                'timings_ms': {name: round(duration * 1000, 2) for name, duration in metrics.timings.items()},
+                'top_duplicates': [
+                    {'sql': sql[:300], 'count': count} for sql, count in duplicates[:3]
+                ],
+            })
+        return record
+
+
+class ProfilerMiddleware:
+    """
+    Perfila requisições sob demanda e grava o resultado em `DIRECTORY`, em
+    uma pasta por endpoint (método e rota).
+
+    Uma requisição é perfilada quando traz o cabeçalho `X-Profile` igual a
+    `TOKEN`, ou em uma fração `SAMPLE_RATE` das demais. O `MODE` escolhe
+    entre `cprofile` (arquivo pstats) e `sampling` (pilhas no formato
+    collapsed, para flamegraph). Sem token e com taxa 0 o middleware se
+    remove da pilha, então pode ficar sempre em MIDDLEWARE.
+
+    Cada pasta guarda no máximo `MAX_FILES_PER_ENDPOINT` perfis, de até
+    `MAX_AGE_HOURS`; os mais antigos são apagados a cada gravação. Apenas uma
+    requisição por processo é perfilada de cada vez; as demais seguem sem
+    perfil. Sob ASGI o perfil inclui as outras tarefas do event
+    loop no mesmo intervalo, e o corpo de respostas em partes é gerado
+    depois que o perfil termina.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = {**REQUEST_PROFILER_DEFAULTS, **getattr(settings, 'REQUEST_PROFILER', {})}
+        if not config['TOKEN'] and config['SAMPLE_RATE'] <= 0:
+            raise MiddlewareNotUsed
+        if config['MODE'] not in PROFILERS:
+            raise ImproperlyConfigured(
+                f"REQUEST_PROFILER['MODE'] deve ser um de: {', '.join(PROFILERS)}"
+            )
+
+        self.get_response = get_response
+        self.config = config
+        self.token = config['TOKEN']
+        self.sample_rate = config['SAMPLE_RATE']
+        self.profiler_class = PROFILERS[config['MODE']]
+        self.directory = config['DIRECTORY']
+        self.max_files = config['MAX_FILES_PER_ENDPOINT']
+        self.max_age = config['MAX_AGE_HOURS'] * 3600
+        self.busy = threading.Lock()
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        profiler, requested = self.start(request)
+        if profiler is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+            self.busy.release()
+        self.save(request, response, profiler, requested, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        profiler, requested = self.start(request)
+        if profiler is None:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+            self.busy.release()
+        # Gravar e podar os arquivos é E/S bloqueante: fora do event loop.
+        await sync_to_async(self.save)(request, response, profiler, requested, time.perf_counter() - started)
+        return response
+
+    def start(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        requested = bool(self.token and header and hmac.compare_digest(header, self.token))
+        if not requested and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None, False
+        if not self.busy.acquire(blocking=False):
+            return None, False
+
+        profiler = self.profiler_class(self.config)
+        profiler.start()
+        return profiler, requested
+
+    def save(self, request, response, profiler, requested, elapsed):
+        endpoint = self.endpoint_name(request)
+        filename = f'{time.strftime("%Y%m%dT%H%M%S")}-{elapsed * 1000:.0f}ms-{uuid.uuid4().hex[:8]}.{profiler.extension}'
+        relative_path = os.path.join(endpoint, filename)
+
+        try:
+            os.makedirs(os.path.join(self.directory, endpoint), exist_ok=True)
+            profiler.dump(os.path.join(self.directory, relative_path))
+            self.prune(os.path.join(self.directory, endpoint))
+        except OSError:
+            profiler_logger.exception('Falha ao gravar o perfil de %s', request.path)
+            return
+
+        profiler_logger.info(json.dumps({
+            'event': 'request_profile',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(elapsed * 1000, 2),
+            'file': relative_path,
+        }))
+        if requested:
+            response['X-Profile-File'] = relative_path
+
+    def prune(self, directory):
+        """
+        Mantém no máximo `MAX_FILES_PER_ENDPOINT` perfis na pasta do endpoint,
+        nenhum mais velho que `MAX_AGE_HOURS`. O nome começa pelo horário,
+        então a ordem alfabética é a cronológica.
+        """
+        entries = sorted(
+            (entry for entry in os.scandir(directory) if entry.is_file()),
+            key=lambda entry: entry.name,
+            reverse=True
+        )
+        oldest = time.time() - self.max_age
+        for index, entry in enumerate(entries):
+            if index >= self.max_files or entry.stat().st_mtime < oldest:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def endpoint_name(self, request):
+        """Nome da pasta do endpoint, a partir da rota: `GET_api_v1_accounts_members_pk`"""
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unresolved'
+        route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'\1', route)
+        return f"{request.method}_{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'}"
@@ -0,0 +1,89 @@
+import cProfile
+import functools
+import os
+import sys
+import threading
+from collections import Counter
+
+
+@functools.cache
+def path_prefixes():
+    """Diretórios do sys.path, dos mais longos para os mais curtos, para encurtar os nomes de arquivo"""
+    return sorted({os.path.join(path, '') for path in sys.path if path}, key=len, reverse=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def frame_label(code):
+    filename = code.co_filename
+    for prefix in path_prefixes():
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    return f'{code.co_qualname} ({filename}:{code.co_firstlineno})'
+
+
+class CProfiler:
+    """Perfil determinístico com cProfile; gera um arquivo pstats (.prof)"""
+    extension = 'prof'
+
+    def __init__(self, config):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """
+    Perfil por amostragem, de baixo custo: uma thread auxiliar lê a pilha da
+    thread que atende a requisição a cada `SAMPLE_INTERVAL_MS` e conta as
+    pilhas iguais.
+
+    Gera o formato "collapsed" (uma pilha por linha, quadros separados por
+    `;` e a contagem no fim), aceito pelo flamegraph.pl e pelo speedscope.
+    O intervalo efetivo não fica abaixo do `sys.getswitchinterval()` (5 ms),
+    e trechos executados em outras threads, como os de `sync_to_async`, não
+    aparecem.
+    """
+    extension = 'collapsed'
+
+    def __init__(self, config):
+        self.interval = config['SAMPLE_INTERVAL_MS'] / 1000
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f'{stack} {count}\n')
+
+
+PROFILERS = {
+    'cprofile': CProfiler,
+    'sampling': StackSampler,
+}
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.RequestMetricsMiddleware',
+    'config.middleware.ProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -84,10 +87,38 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Perfil de produção para SQLite (DATABASE_PROFILE=tuned): WAL para leituras
+# concorrentes com a escrita, synchronous=NORMAL (seguro com WAL), mmap e
+# cache maiores, espera por lock em vez de falhar com "database is locked",
+# transações IMMEDIATE para que escritores concorrentes entrem na fila logo
+# no BEGIN, e conexões persistentes.
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'default')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Valores negativos são em KiB.
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+    'temp_store': 'MEMORY',
+}
+
+if DATABASE_PROFILE == 'tuned':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Espera máxima, em segundos, por um lock antes de "database is locked".
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -108,6 +139,16 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Workers usados para gerar hashes de senha em lote e nas views assíncronas
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+
+# Controle de admissão: máximo de requisições calculando hash de senha ao
+# mesmo tempo por processo e quanto tempo uma requisição espera por uma vaga
+# antes de receber 429.
+PASSWORD_HASHING_CONCURRENCY = int(os.environ.get('PASSWORD_HASHING_CONCURRENCY', PASSWORD_HASHING_WORKERS))
+PASSWORD_HASHING_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASHING_QUEUE_TIMEOUT', 0.5))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -134,12 +175,44 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'custom_auth.User'
 
+# Login pelo email em um único SELECT, com a organização ativa já carregada.
+AUTHENTICATION_BACKENDS = ['auth.backends.EmailBackend']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Em produção use um backend compartilhado entre processos (ex.: Redis), pois
+# a versão de revogação dos tokens é mantida aqui.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
+# Tempo máximo de uma página da listagem de membros no cache; alterações
+# invalidam antes disso via versão por organização (accounts.cache).
+MEMBER_LIST_CACHE_TIMEOUT = int(os.environ.get('MEMBER_LIST_CACHE_TIMEOUT', 300))
+
+
+# Autenticação JWT sem estado: o usuário da requisição é montado a partir das
+# claims do token, sem consultar o banco. Exige um CACHE_BACKEND compartilhado
+# entre os processos (Redis, Memcached), pois a revogação passa pelo cache.
+JWT_STATELESS_AUTH = os.environ.get('JWT_STATELESS_AUTH', 'false').lower() in ('1', 'true', 'yes')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth.authentication.StatelessJWTAuthentication'
+        if JWT_STATELESS_AUTH else
+        'auth.authentication.MembershipJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_RATES': {
+        'password_hash_ip': os.environ.get('PASSWORD_HASH_IP_RATE', '30/min'),
+        'password_hash_email': os.environ.get('PASSWORD_HASH_EMAIL_RATE', '10/min'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -165,7 +238,9 @@ SIMPLE_JWT = {
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'auth.authentication.ClaimsUser',
+
+    'TOKEN_REFRESH_SERIALIZER': 'auth.serializers.CustomTokenRefreshSerializer',
 
     'JTI_CLAIM': 'jti',
 
@@ -174,6 +249,30 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Instrumentação por requisição (config.middleware.RequestMetricsMiddleware):
+# consultas SQL, tempo de banco e cabeçalho Server-Timing para a fração
+# amostrada, e log das requisições lentas ou com consultas repetidas.
+REQUEST_METRICS = {
+    'ENABLED': os.environ.get('REQUEST_METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 1.0 if DEBUG else 0.05)),
+    'SLOW_REQUEST_MS': float(os.environ.get('REQUEST_METRICS_SLOW_MS', 500)),
+    'DUPLICATE_QUERY_THRESHOLD': int(os.environ.get('REQUEST_METRICS_DUPLICATE_THRESHOLD', 5)),
+    'SERVER_TIMING': True,
+}
+
+# Perfil de requisições sob demanda (config.middleware.ProfilerMiddleware):
+# requisições com o cabeçalho `X-Profile: <TOKEN>` e uma fração SAMPLE_RATE
+# das demais. Sem token e com taxa 0 (padrão) o middleware não é carregado.
+REQUEST_PROFILER = {
+    'TOKEN': os.environ.get('REQUEST_PROFILER_TOKEN', ''),
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_PROFILER_SAMPLE_RATE', 0)),
+    'MODE': os.environ.get('REQUEST_PROFILER_MODE', 'cprofile'),
+    'SAMPLE_INTERVAL_MS': float(os.environ.get('REQUEST_PROFILER_SAMPLE_INTERVAL_MS', 5)),
+    'DIRECTORY': os.environ.get('REQUEST_PROFILER_DIR', os.path.join(BASE_DIR, 'profiles')),
+    'MAX_FILES_PER_ENDPOINT': int(os.environ.get('REQUEST_PROFILER_MAX_FILES', 50)),
+    'MAX_AGE_HOURS': float(os.environ.get('REQUEST_PROFILER_MAX_AGE_HOURS', 72)),
+}
+
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
 ]
@@ -20,7 +20,7 @@ from django.views.generic import RedirectView
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
-from auth.views import CustomTokenObtainPairView
+from auth.views import AsyncTokenObtainPairView, CustomTokenObtainPairView
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
 urlpatterns = [
@@ -30,6 +30,7 @@ urlpatterns = [
     path('api/v1/accounts/', include('accounts.urls')),
     path('api/v1/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/v1/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/v1/async/token/', AsyncTokenObtainPairView.as_view(), name='token_obtain_pair_async'),
     path('api/v1/', SpectacularAPIView.as_view(), name='schema'),
     path('api/v1/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/v1/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),